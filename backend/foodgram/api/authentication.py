@@ -0,0 +1,33 @@
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import LRUCache
+
+token_cache = LRUCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кешем token -> user в памяти процесса.
+    Записи сбрасываются при удалении токена и изменении пользователя,
+    в остальных процессах устаревают по TTL.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, (user, token))
+        return user, token
+
+
+def invalidate_token(key):
+    token_cache.delete(key)
+
+
+def invalidate_user(user_id):
+    token_cache.delete_where(lambda key, value: value[0].pk == user_id)
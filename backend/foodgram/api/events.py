@@ -0,0 +1,321 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+
+from recipes.models import Subscribe
+from .authentication import CachedTokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Очередь событий одного соединения. Очередь ограничена: при
+    переполнении теряются самые старые события, а не память сервера.
+    """
+
+    def __init__(self, maxsize):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class BaseBackend:
+    """
+    Интерфейс pub/sub. Межпроцессные реализации (Redis, PostgreSQL
+    LISTEN/NOTIFY) подключаются настройкой EVENTS_BACKEND.
+    """
+
+    # Доходят ли события, опубликованные в другом процессе.
+    cross_process = False
+
+    def subscribe(self, subscription, channels):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription, channels=None):
+        raise NotImplementedError
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+
+class LocalBackend(BaseBackend):
+    """
+    Pub/sub в памяти процесса. Годится, только если API и SSE
+    работают в одном процессе (EVENTS_SINGLE_PROCESS).
+    """
+
+    def __init__(self):
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription, channels):
+        with self._lock:
+            for channel in channels:
+                self._channels[channel].add(subscription)
+
+    def unsubscribe(self, subscription, channels=None):
+        with self._lock:
+            for channel in list(channels or self._channels):
+                subscribers = self._channels.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+
+class PostgresBackend(LocalBackend):
+    """
+    Pub/sub между процессами через LISTEN/NOTIFY PostgreSQL. Публикует
+    любой процесс (WSGI, воркер задач), а процесс с SSE-соединениями
+    слушает канал в отдельном потоке и раздаёт события подписчикам.
+    """
+    channel = 'foodgram_events'
+    cross_process = True
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def subscribe(self, subscription, channels):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen,
+                    daemon=True
+                )
+                self._listener.start()
+        super().subscribe(subscription, channels)
+
+    def publish(self, channel, message):
+        payload = json.dumps(
+            {'channel': channel, 'message': message},
+            ensure_ascii=False
+        )
+        with connections['default'].cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)',
+                [self.channel, payload]
+            )
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception('Соединение LISTEN %s прервано',
+                                 self.channel)
+                time.sleep(1)
+
+    def _listen_once(self):
+        import psycopg2
+
+        params = connections['default'].get_connection_params()
+        connection = psycopg2.connect(**params)
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel}')
+            while True:
+                if not select.select([connection], [], [], 5)[0]:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    data = json.loads(connection.notifies.pop(0).payload)
+                    super().publish(data['channel'], data['message'])
+        finally:
+            connection.close()
+
+
+backend = import_string(settings.EVENTS_BACKEND)()
+
+
+def check_backend():
+    """
+    Вызывается при запуске ASGI-сервиса: без межпроцессного бэкенда
+    SSE-клиенты не получат событий, опубликованных WSGI-процессами.
+    """
+    if not backend.cross_process and not settings.EVENTS_SINGLE_PROCESS:
+        raise ImproperlyConfigured(
+            f'{settings.EVENTS_BACKEND} доставляет события только внутри '
+            'процесса, а API и SSE работают в разных. Нужен '
+            'api.events.PostgresBackend или EVENTS_SINGLE_PROCESS=1, '
+            'если всё обслуживает один процесс uvicorn.'
+        )
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish_recipe(recipe):
+    backend.publish(author_channel(recipe.author_id), {
+        'event': 'recipe',
+        'id': recipe.id,
+        'data': {
+            'id': recipe.id,
+            'name': recipe.name,
+            'author': recipe.author_id,
+            'image': recipe.image.url if recipe.image else None,
+        },
+    })
+
+
+def publish_subscription(user_id, author_id, subscribed):
+    backend.publish(user_channel(user_id), {
+        'event': 'follow' if subscribed else 'unfollow',
+        'author': author_id,
+    })
+
+
+def format_event(message):
+    lines = [f'event: {message["event"]}']
+    if 'id' in message:
+        lines.append(f'id: {message["id"]}')
+    lines.append('data: ' + json.dumps(message['data'], ensure_ascii=False))
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def get_token(scope):
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode('latin-1').split()
+            if len(parts) == 2 and parts[0].lower() == 'token':
+                return parts[1]
+    query = parse_qs(scope.get('query_string', b'').decode())
+    return query.get('token', [None])[0]
+
+
+@sync_to_async
+def authenticate(key):
+    try:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(key)
+    except AuthenticationFailed:
+        return None
+    return user
+
+
+@sync_to_async
+def followed_authors(user):
+    return list(Subscribe.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    ))
+
+
+async def send_response(send, status, body=b''):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def recipe_events(scope, receive, send):
+    """
+    ASGI-приложение: поток Server-Sent Events с новыми рецептами
+    авторов, на которых подписан пользователь. Токен передаётся
+    в заголовке Authorization или параметром ?token=.
+    """
+    if scope['method'] != 'GET':
+        return await send_response(send, 405)
+    key = get_token(scope)
+    user = await authenticate(key) if key else None
+    if user is None:
+        return await send_response(send, 401)
+
+    subscription = Subscription(settings.EVENTS_QUEUE_SIZE)
+    channels = {user_channel(user.id)} | {
+        author_channel(author_id)
+        for author_id in await followed_authors(user)
+    }
+    backend.subscribe(subscription, channels)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': b'retry: 5000\n\n',
+            'more_body': True,
+        })
+        while not disconnect.done():
+            message = asyncio.ensure_future(subscription.queue.get())
+            await asyncio.wait(
+                {message, disconnect},
+                timeout=settings.EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not message.done():
+                message.cancel()
+                if not disconnect.done():
+                    await send({
+                        'type': 'http.response.body',
+                        'body': b': ping\n\n',
+                        'more_body': True,
+                    })
+                continue
+            message = message.result()
+            if message['event'] in ('follow', 'unfollow'):
+                channel = author_channel(message['author'])
+                if message['event'] == 'follow':
+                    channels.add(channel)
+                    backend.subscribe(subscription, [channel])
+                else:
+                    channels.discard(channel)
+                    backend.unsubscribe(subscription, [channel])
+                continue
+            await send({
+                'type': 'http.response.body',
+                'body': format_event(message),
+                'more_body': True,
+            })
+    finally:
+        disconnect.cancel()
+        backend.unsubscribe(subscription, channels)
@@ -16,6 +16,28 @@ class RecipeFilters(rest_framework.FilterSet):
     is_in_shopping_cart = filters.NumberFilter(
         method='get_is_in_shopping_cart'
     )
+    min_kcal = filters.NumberFilter(
+        field_name='total_kcal',
+        lookup_expr='gte'
+    )
+    max_kcal = filters.NumberFilter(
+        field_name='total_kcal',
+        lookup_expr='lte'
+    )
+    min_price = filters.NumberFilter(
+        field_name='total_price',
+        lookup_expr='gte'
+    )
+    max_price = filters.NumberFilter(
+        field_name='total_price',
+        lookup_expr='lte'
+    )
+    ordering = filters.OrderingFilter(
+        fields=(
+            ('total_kcal', 'kcal'),
+            ('total_price', 'price'),
+        )
+    )
 
     class Meta:
         model = Recipes
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест GET-эндпоинта: N одновременных клиентов. '
+        'Запускается против синхронного (gunicorn, wsgi) и асинхронного '
+        '(gunicorn -k uvicorn.workers.UvicornWorker, asgi) стеков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('-c', '--concurrency', type=int, default=500)
+        parser.add_argument('-n', '--requests', type=int, default=5000)
+        parser.add_argument('-t', '--timeout', type=float, default=30)
+        parser.add_argument(
+            '-H', '--header',
+            action='append',
+            default=[],
+            help='Дополнительный заголовок, например "Authorization: Token x".'
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        path = url.path or '/'
+        if url.query:
+            path += '?' + url.query
+        headers = ''.join(f'{header}\r\n' for header in options['header'])
+        self.request = (
+            f'GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\n'
+            f'{headers}Connection: close\r\n\r\n'
+        ).encode()
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.options = options
+        latencies, errors, elapsed = asyncio.run(self.run())
+        self.report(latencies, errors, elapsed)
+
+    async def fetch(self):
+        started = time.perf_counter()
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(self.request)
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+        finally:
+            writer.close()
+        if b' 200 ' not in status_line:
+            raise ValueError(status_line.decode().strip())
+        return time.perf_counter() - started
+
+    async def run(self):
+        latencies = []
+        errors = {}
+        remaining = self.options['requests']
+
+        async def client():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                try:
+                    latencies.append(await asyncio.wait_for(
+                        self.fetch(), self.options['timeout']
+                    ))
+                except (OSError, ValueError, asyncio.TimeoutError) as error:
+                    name = str(error) or type(error).__name__
+                    errors[name] = errors.get(name, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client() for _ in range(self.options['concurrency'])
+        ))
+        return latencies, errors, time.perf_counter() - started
+
+    def report(self, latencies, errors, elapsed):
+        self.stdout.write(
+            f'Запросов: {len(latencies)} за {elapsed:.1f} с, '
+            f'{len(latencies) / elapsed:.0f} в секунду'
+        )
+        if latencies:
+            latencies.sort()
+            self.stdout.write('Задержка, мс: ' + ', '.join(
+                f'p{p} {latencies[len(latencies) * p // 100] * 1000:.0f}'
+                for p in (50, 95, 99)
+            ) + f', max {latencies[-1] * 1000:.0f}')
+        for error, count in errors.items():
+            self.stdout.write(f'Ошибки "{error}": {count}')
@@ -0,0 +1,65 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from api.renderers import ORJSONRenderer, orjson
+
+
+def build_payload(count):
+    author = {
+        'id': 1, 'email': 'author@example.com', 'username': 'author',
+        'first_name': 'Иван', 'last_name': 'Петров', 'is_subscribe': False,
+    }
+    tags = [
+        {'id': i, 'name': f'Тег {i}', 'color': '#E26C2D', 'slug': f'tag{i}'}
+        for i in range(3)
+    ]
+    ingredients = [
+        {'id': i, 'name': f'ингредиент {i}',
+         'measurement_unit': 'г', 'amount': i + 1}
+        for i in range(12)
+    ]
+    results = ReturnList([
+        ReturnDict({
+            'id': i, 'tags': tags, 'author': author,
+            'ingredients': ingredients, 'name': f'Рецепт {i}',
+            'image': f'http://localhost/media/recipes/images/{i}.jpg',
+            'text': 'Описание рецепта. ' * 20, 'cooking_time': 30,
+            'is_favorited': False, 'is_in_shopping_cart': False,
+        }, serializer=None)
+        for i in range(count)
+    ], serializer=None)
+    return {'count': count, 'next': None, 'previous': None,
+            'results': results}
+
+
+class Command(BaseCommand):
+    help = 'Сравнение скорости JSON-рендереров на списке рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--number', type=int, default=200)
+
+    def handle(self, *args, **options):
+        payload = build_payload(options['recipes'])
+        number = options['number']
+        renderers = [('json', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', ORJSONRenderer()))
+        else:
+            self.stdout.write('orjson не установлен, сравнение пропущено.')
+        baseline = None
+        for name, renderer in renderers:
+            body = renderer.render(payload, 'application/json')
+            seconds = min(timeit.repeat(
+                lambda: renderer.render(payload, 'application/json'),
+                number=number,
+                repeat=3
+            )) / number
+            baseline = baseline or seconds
+            self.stdout.write(
+                f'{name:>7}: {seconds * 1000:.3f} мс/ответ, '
+                f'{len(body)} байт, x{baseline / seconds:.1f}'
+            )
@@ -0,0 +1,62 @@
+import timeit
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from rest_framework.throttling import ScopedRateThrottle
+
+from api.throttling import (CacheBucketStore,
+                            LocalBucketStore,
+                            ScopedTokenBucketThrottle)
+
+
+def build_requests(users):
+    return [
+        SimpleNamespace(
+            method='GET',
+            user=SimpleNamespace(is_authenticated=True, pk=pk),
+            META={'REMOTE_ADDR': '127.0.0.1'},
+        )
+        for pk in range(users)
+    ]
+
+
+class NoThrottle:
+    def allow_request(self, request, view):
+        return True
+
+
+class Command(BaseCommand):
+    help = 'Накладные расходы троттлинга на один запрос.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--number', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        requests = build_requests(options['users'])
+        number = options['number']
+        view = SimpleNamespace(action='list', throttle_scope='read')
+        throttles = [
+            ('none', NoThrottle()),
+            ('drf-scoped', ScopedRateThrottle()),
+            ('bucket-local', type(
+                'LocalThrottle', (ScopedTokenBucketThrottle,),
+                {'store': LocalBucketStore()}
+            )()),
+            ('bucket-cache', type(
+                'CacheThrottle', (ScopedTokenBucketThrottle,),
+                {'store': CacheBucketStore()}
+            )()),
+        ]
+        for name, throttle in throttles:
+            state = {'i': 0}
+
+            def call():
+                state['i'] += 1
+                request = requests[state['i'] % len(requests)]
+                throttle.allow_request(request, view)
+
+            seconds = min(timeit.repeat(call, number=number, repeat=3))
+            self.stdout.write(
+                f'{name:>12}: {seconds / number * 1e6:.2f} мкс/запрос'
+            )
@@ -0,0 +1,136 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.crypto import constant_time_compare
+from django.utils.text import compress_sequence, compress_string
+
+from .profiling import PROFILERS, record_profile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r'\bbr\b')
+re_accepts_gzip = _lazy_re_compile(r'\bgzip\b')
+
+
+def compress_brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+        yield compressor.flush()
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжатие ответов brotli (если установлен) или gzip. Обычные ответы
+    меньше COMPRESSION_MIN_SIZE байт не сжимаются, потоковые сжимаются
+    по частям без буферизации всего тела.
+    """
+
+    def process_response(self, request, response):
+        if not self.should_compress(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.select_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            compress = (
+                compress_brotli_sequence if encoding == 'br'
+                else compress_sequence
+            )
+            response.streaming_content = compress(response.streaming_content)
+            del response['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(
+                    response.content,
+                    quality=settings.BROTLI_QUALITY
+                )
+            else:
+                compressed = compress_string(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def should_compress(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        if response.get('Content-Type', '').startswith('image/'):
+            return False
+        return response.streaming or (
+            len(response.content) >= settings.COMPRESSION_MIN_SIZE
+        )
+
+    def select_encoding(self, request):
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and re_accepts_br.search(accept_encoding):
+            return 'br'
+        if re_accepts_gzip.search(accept_encoding):
+            return 'gzip'
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует долю PROFILER_SAMPLE_RATE запросов и запросы
+    с заголовком X-Profile, равным PROFILER_SECRET. Профили копятся
+    по маршрутам и доступны администраторам в /api/profiles/.
+    Без обеих настроек middleware отключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_SAMPLE_RATE and not settings.PROFILER_SECRET:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profiler = PROFILERS[settings.PROFILER_MODE]()
+        try:
+            profiler.start()
+        except ValueError:
+            # В потоке уже работает другой профилировщик.
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = profiler.stop()
+        match = request.resolver_match
+        record_profile(
+            match.route if match else 'unresolved',
+            request,
+            stacks,
+            profiler.mode,
+            time.perf_counter() - started
+        )
+        return response
+
+    def should_profile(self, request):
+        header = request.META.get('HTTP_X_PROFILE')
+        if header and settings.PROFILER_SECRET and constant_time_compare(
+            header, settings.PROFILER_SECRET
+        ):
+            return True
+        return random.random() < settings.PROFILER_SAMPLE_RATE
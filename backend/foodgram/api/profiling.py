@@ -0,0 +1,201 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+
+def frame_name(frame):
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f'{code.co_name} ({filename}:{frame.f_lineno})'
+
+
+class StackSampler:
+    """
+    Статистический профилировщик: отдельный поток раз в interval
+    секунд снимает стек профилируемого потока через
+    sys._current_frames() и считает одинаковые стеки.
+    """
+    mode = 'sample'
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.PROFILER_INTERVAL
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+class CProfiler:
+    """
+    Детерминированный профилировщик на cProfile. Стеков он не знает,
+    поэтому «стек» здесь - пара вызывающая;вызываемая функция, вес -
+    собственное время вызываемой в микросекундах.
+    """
+    mode = 'cprofile'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        stacks = Counter()
+        for func, (_, _, tottime, _, callers) in pstats.Stats(
+            self.profile
+        ).stats.items():
+            name = pstats.func_std_string(func)
+            for caller, (_, _, own_time, _) in callers.items():
+                key = f'{pstats.func_std_string(caller)};{name}'
+                stacks[key] += int(own_time * 1e6)
+            if not callers:
+                stacks[name] += int(tottime * 1e6)
+        return stacks
+
+
+PROFILERS = {
+    StackSampler.mode: StackSampler,
+    CProfiler.mode: CProfiler,
+}
+
+
+class ProfileStore:
+    """
+    Последние профили по маршрутам: на каждый маршрут кольцевой
+    буфер из PROFILER_BUFFER_SIZE записей.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or settings.PROFILER_BUFFER_SIZE
+        self._routes = defaultdict(lambda: deque(maxlen=self.size))
+        self._lock = threading.Lock()
+
+    def add(self, route, entry):
+        with self._lock:
+            self._routes[route].append(entry)
+
+    def routes(self):
+        with self._lock:
+            return {
+                route: list(entries)
+                for route, entries in self._routes.items()
+            }
+
+    def merged(self, route=None):
+        """
+        Суммарные стеки по маршруту или по всем маршрутам.
+        """
+        stacks = Counter()
+        for name, entries in self.routes().items():
+            if route is None or name == route:
+                for entry in entries:
+                    stacks.update(entry['stacks'])
+        return stacks
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+profile_store = ProfileStore()
+
+
+def top_stacks(stacks, limit=None):
+    return dict(Counter(stacks).most_common(
+        limit or settings.PROFILER_TOP_STACKS
+    ))
+
+
+def to_collapsed(stacks):
+    """
+    Формат collapsed stacks для flamegraph.pl и speedscope.
+    """
+    return ''.join(
+        f'{stack} {weight}\n'
+        for stack, weight in sorted(stacks.items())
+    )
+
+
+def to_speedscope(stacks, name='foodgram'):
+    frames = {}
+    samples = []
+    weights = []
+    for stack, weight in stacks.items():
+        samples.append([
+            frames.setdefault(frame, len(frames))
+            for frame in stack.split(';')
+        ])
+        weights.append(weight)
+    return json.dumps({
+        '$schema': SPEEDSCOPE_SCHEMA,
+        'shared': {'frames': [{'name': frame} for frame in frames]},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'none',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+        'name': name,
+        'exporter': 'foodgram',
+    })
+
+
+def dump_profile(route, entry):
+    """
+    Сохраняет профиль в PROFILER_DUMP_DIR в формате collapsed stacks.
+    """
+    slug = re.sub(r'[^\w-]+', '_', route).strip('_') or 'root'
+    filename = os.path.join(
+        settings.PROFILER_DUMP_DIR,
+        f'{slug}-{int(entry["timestamp"] * 1000)}.collapsed'
+    )
+    os.makedirs(settings.PROFILER_DUMP_DIR, exist_ok=True)
+    with open(filename, 'w') as file:
+        file.write(to_collapsed(entry['stacks']))
+
+
+def record_profile(route, request, stacks, mode, duration):
+    entry = {
+        'timestamp': time.time(),
+        'method': request.method,
+        'path': request.path,
+        'mode': mode,
+        'duration': round(duration * 1000, 2),
+        'stacks': top_stacks(stacks),
+    }
+    profile_store.add(route, entry)
+    if settings.PROFILER_DUMP_DIR:
+        dump_profile(route, entry)
+    return entry
@@ -0,0 +1,70 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Даты и время передаются в _default, чтобы формат совпадал
+# с JSONRenderer (UTC как Z, миллисекунды вместо микросекунд).
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson is not None else 0
+)
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """
+    Типы, которых не знает orjson (ленивые строки, Decimal, QuerySet),
+    и даты приводятся так же, как в стандартном кодировщике DRF.
+    """
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson. ReturnList/ReturnDict сериализуются
+    как обычные list/dict. Без orjson или при запросе отступов
+    работает стандартный JSONRenderer. Как и он, экранирует U+2028
+    и U+2029, недопустимые в строках JavaScript.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(
+            data, default=_default, option=ORJSON_OPTIONS
+        ).replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSON-парсер на orjson с откатом на стандартный JSONParser.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
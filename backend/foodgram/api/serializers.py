@@ -1,20 +1,59 @@
 import base64
+from collections import Counter
 
 from django.contrib.auth.models import User
 from django.core.files.base import ContentFile
 from djoser.serializers import (UserSerializer,
                                 UserCreateSerializer)
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.validators import UniqueValidator
 from django.core.validators import MinValueValidator
 
+from jobs.models import Job
 from recipes.models import (Ingredients,
                             Tags,
                             Recipes,
-                            IngredientsForRecipe,
-                            Subscribe,
-                            Favorite,
-                            Shopping)
+                            IngredientsForRecipe)
+from recipes.services import recount_totals
+from .viewer import get_viewer_state
+
+
+def find_duplicates(values):
+    return sorted(
+        value for value, count in Counter(values).items() if count > 1
+    )
+
+
+def split_param(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Выбор полей ответа параметрами запроса ?fields= и ?omit=.
+    Действует только для безопасных методов.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+        selected = self.requested_fields(request, self.fields)
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, request, fields=None):
+        selected = set(fields or cls.Meta.fields)
+        if request is None or request.method not in SAFE_METHODS:
+            return selected
+        only = split_param(request.query_params.get('fields'))
+        if only:
+            selected &= only
+        return selected - split_param(request.query_params.get('omit'))
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -63,7 +102,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         return user
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SparseFieldsMixin, UserSerializer):
     """
     Сериализатор пользователя. Метод GET.
     """
@@ -77,10 +116,9 @@ class CustomUserSerializer(UserSerializer):
         model = User
 
     def get_is_subscribe(self, obj):
-        return Subscribe.objects.filter(
-            user_id=self.context.get('request').user.id,
-            author_id=obj.id
-        ).exists()
+        return obj.id in get_viewer_state(
+            self.context['request']
+        ).subscriptions
 
 
 class IngredientsSerializer(serializers.ModelSerializer):
@@ -103,20 +141,15 @@ class TagsSerializer(serializers.ModelSerializer):
         model = Tags
 
 
-class AddIngredientSerializer(serializers.ModelSerializer):
+class AddIngredientSerializer(serializers.Serializer):
     """
-    Сериализатор добавления ингредиентов к рецепту.
+    Сериализатор добавления ингредиентов к рецепту. Существование
+    ингредиентов проверяет RecipesSerializer одним запросом на все.
     """
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         validators=[MinValueValidator(1)]
     )
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredients.objects.all()
-    )
-
-    class Meta:
-        fields = ['id', 'amount']
-        model = IngredientsForRecipe
 
 
 class ShowIngredientsSerializer(serializers.ModelSerializer):
@@ -143,16 +176,16 @@ class CustomBase64Image(serializers.ImageField):
         return super().to_internal_value(data)
 
 
-class RecipesSerializer(serializers.ModelSerializer):
+class RecipesSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор создания/просмотра/редактирования/удаления рецептов.
     Методы POST/GET/PATCH/DELETE.
     """
     author = CustomUserSerializer(required=False)
     image = CustomBase64Image()
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tags.objects.all(),
-        many=True
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        write_only=True
     )
     ingredients = AddIngredientSerializer(
         many=True,
@@ -164,22 +197,62 @@ class RecipesSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ['id', 'ingredients', 'tags', 'name',
                   'author', 'image', 'text', 'cooking_time',
-                  'is_favorited', 'is_in_shopping_cart']
+                  'is_favorited', 'is_in_shopping_cart',
+                  'total_kcal', 'total_protein', 'total_fat',
+                  'total_carbs', 'total_price']
+        read_only_fields = ['total_kcal', 'total_protein', 'total_fat',
+                            'total_carbs', 'total_price']
         model = Recipes
 
+    def validate_tags(self, value):
+        duplicates = find_duplicates(value)
+        if duplicates:
+            raise serializers.ValidationError(
+                f'Теги повторяются: {duplicates}'
+            )
+        tags = Tags.objects.in_bulk(value)
+        unknown = [pk for pk in value if pk not in tags]
+        if unknown:
+            raise serializers.ValidationError(
+                f'Тегов не существует: {unknown}'
+            )
+        return [tags[pk] for pk in value]
+
+    def validate_ingredients(self, value):
+        ids = [item['id'] for item in value]
+        duplicates = set(find_duplicates(ids))
+        ingredients = Ingredients.objects.in_bulk(ids)
+        errors = []
+        for pk in ids:
+            if pk in duplicates:
+                errors.append({'id': [f'Ингредиент {pk} повторяется.']})
+            elif pk not in ingredients:
+                errors.append({'id': [f'Ингредиента {pk} не существует.']})
+            else:
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [
+            IngredientsForRecipe(
+                ingredients=ingredients[item['id']],
+                amount=item['amount']
+            )
+            for item in value
+        ]
+
+    def set_ingredients(self, recipe, ingredients):
+        for item in ingredients:
+            item.recipe = recipe
+        IngredientsForRecipe.objects.bulk_create(ingredients)
+
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipes.objects.create(**validated_data)
-        for tag in tags:
-            recipe.tags.add(tag)
-        for ingredient in ingredients:
-            created = IngredientsForRecipe.objects.create(
-                recipe=recipe,
-                amount=ingredient['amount'],
-                ingredients=ingredient['id'],
-            )
-            created.save()
+        recipe.tags.set(tags)
+        self.set_ingredients(recipe, ingredients)
+        recount_totals([recipe.pk])
+        recipe.refresh_from_db(fields=self.Meta.read_only_fields)
         return recipe
 
     def update(self, instance, validated_data):
@@ -190,38 +263,35 @@ class RecipesSerializer(serializers.ModelSerializer):
             'cooking_time',
             instance.cooking_time
         )
-        instance.tags.set(validated_data.get('tags', instance.tags.all()))
-        ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        for ingredient in ingredients:
-            IngredientsForRecipe.objects.create(
-                recipe=instance,
-                ingredients=ingredient['id'],
-                amount=ingredient['amount']
-            )
+        if 'tags' in validated_data:
+            instance.tags.set(validated_data['tags'])
+        if 'ingredients' in validated_data:
+            instance.recipe_ingredients.all().delete()
+            self.set_ingredients(instance, validated_data['ingredients'])
         instance.save()
+        recount_totals([instance.pk])
+        instance.refresh_from_db(fields=self.Meta.read_only_fields)
         return instance
 
     def to_representation(self, instance):
         data = super(RecipesSerializer, self).to_representation(instance)
-        data['tags'] = TagsSerializer(instance.tags.all(), many=True).data
-        data['ingredients'] = ShowIngredientsSerializer(
-            instance.recipe_ingredients.all(),
-            many=True
-        ).data
+        if 'tags' in self.fields:
+            data['tags'] = TagsSerializer(
+                instance.tags.all(),
+                many=True
+            ).data
+        if 'ingredients' in self.fields:
+            data['ingredients'] = ShowIngredientsSerializer(
+                instance.recipe_ingredients.all(),
+                many=True
+            ).data
         return data
 
     def get_is_favorited(self, obj):
-        return Favorite.objects.filter(
-            user=self.context.get('request').user,
-            recipe=obj
-        ).exists()
+        return obj.id in get_viewer_state(self.context['request']).favorites
 
     def get_is_in_shopping_cart(self, obj):
-        return Shopping.objects.filter(
-            user=self.context.get('request').user,
-            recipe=obj
-        ).exists()
+        return obj.id in get_viewer_state(self.context['request']).cart
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -231,7 +301,7 @@ class FavoriteSerializer(serializers.ModelSerializer):
         model = Recipes
 
 
-class SubscribeSerializer(serializers.ModelSerializer):
+class SubscribeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
     is_subscribe = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
@@ -250,10 +320,20 @@ class SubscribeSerializer(serializers.ModelSerializer):
         ).data
 
     def get_is_subscribe(self, obj):
-        return Subscribe.objects.filter(
-            user_id=self.context.get('request').user.id,
-            author_id=obj.id
-        ).exists()
+        return obj.id in get_viewer_state(
+            self.context['request']
+        ).subscriptions
 
     def get_recipes_count(self, obj):
         return Recipes.objects.filter(author=obj).count()
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор статуса фоновой задачи. Метод GET.
+    """
+
+    class Meta:
+        fields = ['id', 'task', 'status', 'progress', 'attempts',
+                  'result', 'error', 'created_at', 'updated_at']
+        model = Job
@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.bulk import importing
+from recipes.models import Recipes, Subscribe
+from .authentication import invalidate_token, invalidate_user
+from .events import publish_recipe, publish_subscription
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_changed_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Recipes)
+def announce_recipe(sender, instance, created, **kwargs):
+    if created and not importing.get():
+        transaction.on_commit(lambda: publish_recipe(instance))
+
+
+@receiver(post_save, sender=Subscribe)
+@receiver(post_delete, sender=Subscribe)
+def announce_subscription(sender, instance, **kwargs):
+    subscribed = kwargs.get('created', False)
+    transaction.on_commit(lambda: publish_subscription(
+        instance.user_id, instance.author_id, subscribed
+    ))
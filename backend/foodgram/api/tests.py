@@ -0,0 +1,274 @@
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from recipes.bulk import RecipeImporter
+from recipes.models import Recipes, Subscribe, Tags, Tombstone
+from . import events
+from .authentication import token_cache
+from .renderers import ORJSONRenderer
+from .throttling import LocalBucketStore
+from .viewer import viewer_cache
+
+
+class UserListQueriesTest(TestCase):
+    """
+    Число запросов списка и карточки пользователей не зависит
+    от числа пользователей на странице.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create(
+            username='viewer', email='viewer@example.com'
+        )
+        User.objects.bulk_create(
+            User(username=f'author{number}',
+                 email=f'author{number}@example.com')
+            for number in range(10)
+        )
+        authors = User.objects.filter(username__startswith='author')
+        Subscribe.objects.bulk_create(
+            Subscribe(user=cls.viewer, author=author)
+            for author in authors[:3]
+        )
+
+    def setUp(self):
+        token_cache.clear()
+        viewer_cache.clear()
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def test_anonymous_list(self):
+        # Страница и COUNT(*) для пагинации.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(
+            user['is_subscribe'] for user in response.json()['results']
+        ))
+
+    def test_authenticated_list(self):
+        self.client.force_authenticate(self.viewer)
+        # Страница, COUNT(*) и один запрос подписок зрителя.
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        subscribed = [
+            user['username'] for user in response.json()['results']
+            if user['is_subscribe']
+        ]
+        self.assertEqual(subscribed, ['author0', 'author1', 'author2'])
+
+    def test_authenticated_detail(self):
+        self.client.force_authenticate(self.viewer)
+        author = User.objects.get(username='author0')
+        # Пользователь и подписки зрителя.
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/users/{author.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_subscribe'])
+
+
+class RecipeConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create(
+            username='viewer', email='viewer@example.com'
+        )
+        Recipes.objects.bulk_create(
+            Recipes(name=f'Рецепт {number}', text='Описание',
+                    cooking_time=10, author=cls.viewer)
+            for number in range(3)
+        )
+
+    def setUp(self):
+        token_cache.clear()
+        viewer_cache.clear()
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def test_non_integer_pk(self):
+        response = self.client.get('/api/recipes/abc/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified(self):
+        etag = self.client.get('/api/recipes/')['ETag']
+        # Два запроса валидаторов, без выборки рецептов.
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                '/api/recipes/', HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_sparse_fields_skip_viewer_state(self):
+        self.client.force_authenticate(self.viewer)
+        # Валидаторы, COUNT(*) и страница; множества зрителя не нужны.
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/recipes/?fields=id,name')
+        self.assertEqual(response.status_code, 200)
+
+    def test_tag_change_invalidates_etag(self):
+        tag = Tags.objects.create(name='Завтрак', color='#FF0000',
+                                  slug='breakfast')
+        etag = self.client.get('/api/recipes/')['ETag']
+        tag.name = 'Ужин'
+        tag.save()
+        response = self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ORJSONRendererTest(SimpleTestCase):
+
+    def test_matches_json_renderer(self):
+        data = {
+            'timestamp': datetime(2024, 5, 1, 12, 30, 15, 173175,
+                                  tzinfo=timezone.utc),
+            'date': datetime(2024, 5, 1).date(),
+            'text': 'строка\u2028с\u2029разделителями',
+            'price': Decimal('1.50'),
+        }
+        self.assertEqual(
+            ORJSONRenderer().render(data),
+            JSONRenderer().render(data)
+        )
+
+
+@override_settings(DELTA_SYNC_PAGE_SIZE=2)
+class DeltaSyncTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Tags.objects.bulk_create(
+            Tags(name=f'Тег {number}', color=f'#00000{number}',
+                 slug=f'tag{number}')
+            for number in range(8)
+        )
+        cls.since = Tags.objects.order_by('pk').first().updated_at
+        deleted = Tags.objects.order_by('-pk')[:5]
+        cls.deleted = sorted(tag.pk for tag in deleted)
+        for tag in deleted:
+            tag.delete()
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def sync(self, updated_since):
+        url = '/api/tags/'
+        params = {'updated_since': updated_since.isoformat()}
+        updated, deleted, timestamps = [], [], set()
+        while url:
+            response = self.client.get(url, params)
+            params = None
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertLessEqual(len(data['deleted']), 2)
+            updated += [tag['id'] for tag in data['updated']]
+            deleted += data['deleted']
+            timestamps.add(data['timestamp'])
+            url = data['next']
+        self.assertEqual(len(timestamps), 1)
+        return updated, deleted, timestamps.pop()
+
+    def test_pages_deleted_ids(self):
+        updated, deleted, _ = self.sync(self.since - timedelta(seconds=1))
+        self.assertEqual(len(updated), 3)
+        self.assertEqual(sorted(deleted), self.deleted)
+
+    def test_timestamp_round_trip(self):
+        _, _, timestamp = self.sync(self.since - timedelta(seconds=1))
+        response = self.client.get(
+            '/api/tags/', {'updated_since': timestamp}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], [])
+        self.assertEqual(response.json()['deleted'], [])
+
+    def test_full_resync_required(self):
+        response = self.client.get('/api/tags/?updated_since=0')
+        self.assertEqual(response.status_code, 410)
+
+    @override_settings(TOMBSTONE_RETENTION=0)
+    def test_prune_tombstones(self):
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
+
+
+class RecipeEventsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+
+    def publish(self, create):
+        with mock.patch.object(events.backend, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                create()
+        return publish
+
+    def test_created_recipe_announced(self):
+        publish = self.publish(lambda: Recipes.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10,
+            author=self.author
+        ))
+        publish.assert_called_once()
+
+    def test_import_not_announced(self):
+        line = json.dumps({
+            'name': 'Рецепт', 'author': self.author.email, 'image': '',
+            'text': 'Описание', 'cooking_time': 10, 'tags': [],
+            'ingredients': [],
+        })
+        importer = RecipeImporter()
+        publish = self.publish(lambda: importer.run([line, line]))
+        self.assertEqual(importer.imported, 2)
+        publish.assert_not_called()
+
+    def test_local_backend_needs_single_process(self):
+        with mock.patch.object(events, 'backend', events.LocalBackend()):
+            with self.settings(EVENTS_SINGLE_PROCESS=False):
+                with self.assertRaises(ImproperlyConfigured):
+                    events.check_backend()
+            with self.settings(EVENTS_SINGLE_PROCESS=True):
+                events.check_backend()
+        with mock.patch.object(events, 'backend', events.PostgresBackend()):
+            events.check_backend()
+
+
+class LocalBucketStoreTest(SimpleTestCase):
+
+    def test_evicts_least_recently_used(self):
+        store = LocalBucketStore(maxsize=10)
+        store.consume('busy', 1, 0.001)
+        for number in range(9):
+            store.consume(f'new{number}', 1, 0.001)
+            # Клиент, упёршийся в лимит, тоже считается активным.
+            self.assertGreater(store.consume('busy', 1, 0.001), 0)
+        store.consume('overflow', 1, 0.001)
+        self.assertGreater(store.consume('busy', 1, 0.001), 0)
+        self.assertEqual(store.consume('new0', 1, 0.001), 0)
+
+
+class ProfilesViewTest(TestCase):
+
+    def test_admin_session(self):
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get('/api/profiles/', SERVER_NAME='localhost')
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous(self):
+        response = self.client.get('/api/profiles/', SERVER_NAME='localhost')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,161 @@
+import math
+import time
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """
+    '30/min' -> (ёмкость корзины, токенов в секунду).
+    """
+    if rate is None:
+        return None
+    number, period = rate.split('/')
+    capacity = int(number)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+def refill(state, capacity, rate, now):
+    """
+    Сколько токенов в корзине к моменту now.
+    """
+    if state is None:
+        return capacity
+    tokens, stamp = state[0], state[1]
+    return min(capacity, tokens + (now - stamp) * rate)
+
+
+class BaseBucketStore:
+    """
+    Хранилище корзин. consume() забирает токен и возвращает 0 или
+    через сколько секунд токен появится.
+    """
+
+    def consume(self, key, capacity, rate):
+        raise NotImplementedError
+
+
+class LocalBucketStore(BaseBucketStore):
+    """
+    Корзины в памяти процесса без блокировок: состояние корзины -
+    неизменяемый кортеж (токены, время, когда корзина снова станет
+    полной), который заменяется одним присваиванием.
+    При гонке двух потоков один из них может получить лишний токен,
+    это дешевле блокировки на каждом запросе. Ключ при каждом
+    обращении переставляется в конец словаря, поэтому при переполнении
+    вытесняются давно не использованные корзины.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize or settings.THROTTLE_LOCAL_MAXSIZE
+        self._buckets = {}
+
+    def consume(self, key, capacity, rate):
+        now = time.monotonic()
+        state = self._buckets.pop(key, None)
+        tokens = refill(state, capacity, rate, now)
+        if tokens < 1:
+            self._buckets[key] = state
+            return (1 - tokens) / rate
+        full_at = now + (capacity - tokens + 1) / rate
+        self._buckets[key] = (tokens - 1, now, full_at)
+        if len(self._buckets) > self.maxsize:
+            self.prune()
+        return 0
+
+    def prune(self):
+        """
+        Забывает уже полные корзины: они ничем не отличаются
+        от отсутствующих. Если этого мало, освобождает десятую часть
+        места за счёт давно не использованных ключей, чтобы не чистить
+        словарь на каждом запросе.
+        """
+        now = time.monotonic()
+        for key, state in list(self._buckets.items()):
+            if state[2] <= now:
+                self._buckets.pop(key, None)
+        overflow = len(self._buckets) - self.maxsize * 9 // 10
+        if overflow > 0:
+            for key in list(self._buckets)[:overflow]:
+                self._buckets.pop(key, None)
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class CacheBucketStore(BaseBucketStore):
+    """
+    Корзины в кеше Django (THROTTLE_CACHE), общие для всех процессов.
+    Чтение и запись не атомарны, поэтому под гонкой лимит мягкий.
+    """
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or settings.THROTTLE_CACHE]
+
+    def consume(self, key, capacity, rate):
+        now = time.time()
+        key = f'throttle:{key}'
+        tokens = refill(self.cache.get(key), capacity, rate, now)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        self.cache.set(key, (tokens - 1, now), math.ceil(capacity / rate))
+        return 0
+
+
+bucket_store = import_string(settings.THROTTLE_STORE)()
+stats = {'allowed': Counter(), 'throttled': Counter()}
+
+
+def throttle_stats():
+    return {name: dict(counter) for name, counter in stats.items()}
+
+
+class ScopedTokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket по областям: действие представления выбирает область
+    через throttle_scopes, остальные запросы делятся на read и write.
+    Лимиты задаются в DEFAULT_THROTTLE_RATES.
+    """
+    store = bucket_store
+
+    def get_scope(self, request, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        scope = scopes.get(getattr(view, 'action', None))
+        if scope is not None:
+            return scope
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'anon:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(scope))
+        if rate is None:
+            return True
+        self.wait_time = self.store.consume(
+            f'{scope}:{self.get_cache_key(request, view)}', *rate
+        )
+        if self.wait_time:
+            stats['throttled'][scope] += 1
+            return False
+        stats['allowed'][scope] += 1
+        return True
+
+    def wait(self):
+        return self.wait_time
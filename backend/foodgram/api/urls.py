@@ -1,10 +1,15 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import async_read_view
 from .views import (IngredientsViewSet,
                     TagsViewSet,
                     RecipesViewSet,
-                    CustomUserViewSet)
+                    CustomUserViewSet,
+                    JobViewSet,
+                    MetricsView,
+                    ProfilesView)
 
 router = DefaultRouter()
 
@@ -12,9 +17,38 @@ router.register('users', CustomUserViewSet)
 router.register('ingredients', IngredientsViewSet)
 router.register('tags', TagsViewSet)
 router.register('recipes', RecipesViewSet)
+router.register('jobs', JobViewSet, basename='jobs')
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view()),
+    path('profiles/', ProfilesView.as_view()),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = [
+        path('tags/', async_read_view(
+            TagsViewSet.as_view({'get': 'list'})
+        )),
+        path('tags/<int:pk>/', async_read_view(
+            TagsViewSet.as_view({'get': 'retrieve'})
+        )),
+        path('ingredients/', async_read_view(
+            IngredientsViewSet.as_view({'get': 'list'})
+        )),
+        path('ingredients/<int:pk>/', async_read_view(
+            IngredientsViewSet.as_view({'get': 'retrieve'})
+        )),
+        path('recipes/', async_read_view(
+            RecipesViewSet.as_view({'get': 'list', 'post': 'create'})
+        )),
+        path('recipes/<int:pk>/', async_read_view(
+            RecipesViewSet.as_view({
+                'get': 'retrieve',
+                'patch': 'partial_update',
+                'delete': 'destroy',
+            })
+        )),
+    ] + urlpatterns
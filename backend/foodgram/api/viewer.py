@@ -0,0 +1,67 @@
+from django.conf import settings
+
+from recipes.models import Favorite, Shopping, Subscribe
+from .cache import LRUCache
+
+viewer_cache = LRUCache(
+    maxsize=settings.VIEWER_STATE_CACHE_SIZE,
+    ttl=settings.VIEWER_STATE_TTL
+)
+
+
+class ViewerState:
+    """
+    Избранное, список покупок и подписки текущего пользователя.
+    Каждое множество id загружается одним запросом при первом обращении.
+    """
+
+    def __init__(self, user):
+        self.user_id = user.id if user.is_authenticated else None
+        self._sets = {}
+
+    def _load(self, name, model, field):
+        if name not in self._sets:
+            self._sets[name] = self._fetch(name, model, field)
+        return self._sets[name]
+
+    def _fetch(self, name, model, field):
+        if self.user_id is None:
+            return frozenset()
+        key = (self.user_id, name)
+        ids = viewer_cache.get(key)
+        if ids is None:
+            ids = frozenset(model.objects.filter(
+                user_id=self.user_id
+            ).values_list(field, flat=True))
+            viewer_cache.set(key, ids)
+        return ids
+
+    def reset(self, name):
+        self._sets.pop(name, None)
+
+    @property
+    def favorites(self):
+        return self._load('favorites', Favorite, 'recipe_id')
+
+    @property
+    def cart(self):
+        return self._load('cart', Shopping, 'recipe_id')
+
+    @property
+    def subscriptions(self):
+        return self._load('subscriptions', Subscribe, 'author_id')
+
+
+def get_viewer_state(request):
+    state = getattr(request, 'viewer_state', None)
+    if state is None:
+        state = ViewerState(request.user)
+        request.viewer_state = state
+    return state
+
+
+def invalidate_viewer_state(request, name):
+    viewer_cache.delete((request.user.id, name))
+    state = getattr(request, 'viewer_state', None)
+    if state is not None:
+        state.reset(name)
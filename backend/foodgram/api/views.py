@@ -1,51 +1,324 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.http import HttpResponse
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Max, Prefetch, Q, Subquery
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control,
+                                patch_vary_headers)
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, status
+from djoser.views import UserViewSet
+from rest_framework import mixins, viewsets, status
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (AllowAny,
+                                        IsAdminUser,
                                         IsAuthenticatedOrReadOnly,
                                         IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 
+from jobs.models import Job
+from jobs.registry import enqueue
+from recipes.bulk import export_ndjson
 from recipes.models import (Ingredients,
                             Tags,
                             Recipes,
                             Favorite,
                             Subscribe,
                             Shopping,
-                            IngredientsForRecipe)
+                            IngredientsForRecipe,
+                            Tombstone)
+from recipes.services import shopping_list_text
+from recipes.tasks import render_shopping_list, schedule_user_deletion
+from .authentication import CachedTokenAuthentication, token_cache
 from .filters import RecipeFilters, IngredientsFilter
 from .paginations import CustomPagination
 from .permissions import IsAuthorOrReadOnly
+from .profiling import profile_store, to_collapsed, to_speedscope
 from .serializers import (IngredientsSerializer,
                           TagsSerializer,
                           RecipesSerializer,
                           FavoriteSerializer,
-                          SubscribeSerializer)
+                          SubscribeSerializer,
+                          JobSerializer)
+from .throttling import throttle_stats
+from .viewer import get_viewer_state, invalidate_viewer_state, viewer_cache
+
+
+def parse_updated_since(value):
+    """
+    Принимает дату в ISO 8601 или unix-время в секундах.
+    """
+    try:
+        return datetime.fromtimestamp(float(value), timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        pass
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({'updated_since': 'Неверный формат даты.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def encode_cursor(timestamp, *positions):
+    return urlsafe_b64encode(json.dumps([timestamp.isoformat()] + [
+        None if position is None else [position[0].isoformat(), position[1]]
+        for position in positions
+    ]).encode()).decode()
+
+
+def decode_position(value):
+    if value is None:
+        return None
+    moment, pk = value
+    moment = parse_datetime(moment)
+    if moment is None:
+        raise ValueError
+    return moment, int(pk)
+
+
+def decode_cursor(value):
+    try:
+        timestamp, updated, deleted = json.loads(urlsafe_b64decode(value))
+        timestamp = parse_datetime(timestamp)
+        updated = decode_position(updated)
+        deleted = decode_position(deleted)
+    except (ValueError, TypeError):
+        timestamp = None
+    if timestamp is None:
+        raise ValidationError({'cursor': 'Неверный курсор.'})
+    return timestamp, updated, deleted
+
+
+def take_page(queryset, field, position):
+    """
+    Страница DELTA_SYNC_PAGE_SIZE строк queryset, упорядоченного
+    по (field, pk), после position. Возвращает строки, позицию
+    последней из них и признак, что есть ещё.
+    """
+    if position is not None:
+        moment, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{field}__gt': moment})
+            | Q(**{field: moment, 'pk__gt': pk})
+        )
+    page = list(queryset.order_by(field, 'pk')[
+        :settings.DELTA_SYNC_PAGE_SIZE + 1
+    ])
+    more = len(page) > settings.DELTA_SYNC_PAGE_SIZE
+    page = page[:settings.DELTA_SYNC_PAGE_SIZE]
+    if page:
+        position = (getattr(page[-1], field), page[-1].pk)
+    return page, position, more
+
+
+def latest(queryset):
+    return queryset.order_by('-updated_at').values('updated_at')[:1]
+
+
+class DeltaSyncMixin:
+    """
+    С параметром ?updated_since= список отдаёт только объекты,
+    изменённые после указанного времени, и id удалённых. И те, и другие
+    отдаются страницами по DELTA_SYNC_PAGE_SIZE с общим курсором:
+    ссылка на следующую страницу - в next. timestamp одинаков на всех
+    страницах, его и нужно передать в следующую синхронизацию.
+    Записи об удалении хранятся TOMBSTONE_RETENTION секунд; для более
+    старого updated_since ответ 410, нужна полная синхронизация.
+    """
+
+    def list(self, request, *args, **kwargs):
+        value = request.query_params.get('updated_since')
+        if value is None:
+            return super().list(request, *args, **kwargs)
+        updated_since = parse_updated_since(value)
+        if updated_since < timezone.now() - timedelta(
+                seconds=settings.TOMBSTONE_RETENTION):
+            return Response(
+                {'detail': 'Слишком старая дата, нужна полная '
+                           'синхронизация без updated_since.'},
+                status=status.HTTP_410_GONE
+            )
+        cursor = request.query_params.get('cursor')
+        if cursor is None:
+            timestamp, updated_position, deleted_position = (
+                timezone.now(), None, None
+            )
+        else:
+            timestamp, updated_position, deleted_position = decode_cursor(
+                cursor
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        updated, updated_position, more_updated = take_page(
+            queryset.filter(updated_at__gt=updated_since),
+            'updated_at',
+            updated_position
+        )
+        deleted, deleted_position, more_deleted = take_page(
+            Tombstone.objects.filter(
+                model=queryset.model._meta.model_name,
+                deleted_at__gt=updated_since
+            ),
+            'deleted_at',
+            deleted_position
+        )
+        next_url = None
+        if more_updated or more_deleted:
+            next_url = replace_query_param(
+                request.build_absolute_uri(),
+                'cursor',
+                encode_cursor(timestamp, updated_position, deleted_position)
+            )
+        return Response({
+            'timestamp': timestamp,
+            'updated': self.get_serializer(updated, many=True).data,
+            'deleted': [tombstone.object_id for tombstone in deleted],
+            'next': next_url,
+        })
 
 
-class CustomUserViewSet(viewsets.GenericViewSet):
+class ConditionalGetMixin:
+    """
+    ETag и Last-Modified для списка и детальной страницы считаются
+    до сериализации по времени последнего изменения всего, что входит
+    в ответ, неизменившиеся страницы отдаются ответом 304.
+    Last-Modified не учитывает избранное и корзину, поэтому
+    авторизованным пользователям отдаётся только ETag.
+    """
+    viewer_fields = {
+        'is_favorited': 'favorites',
+        'is_in_shopping_cart': 'cart',
+        'author': 'subscriptions',
+    }
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(
+            queryset, super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            queryset = queryset.filter(
+                pk=kwargs[self.lookup_url_kwarg or self.lookup_field]
+            )
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        return self.conditional_response(
+            queryset, super().retrieve, request, *args, **kwargs
+        )
+
+    def get_last_modified(self, queryset):
+        """
+        Последнее изменение рецептов выборки, тегов и ингредиентов
+        (один запрос) и удаление любых из них (второй запрос). Правка
+        автора поднимает updated_at его рецептов (recipes.signals).
+        """
+        changed = queryset.order_by().aggregate(
+            recipes=Max('updated_at'),
+            tags=Max(Subquery(latest(Tags.objects.all()))),
+            ingredients=Max(Subquery(latest(Ingredients.objects.all())))
+        )
+        deleted = Tombstone.objects.filter(
+            model__in=[queryset.model._meta.model_name,
+                       Tags._meta.model_name,
+                       Ingredients._meta.model_name]
+        ).aggregate(last=Max('deleted_at'))['last']
+        candidates = [
+            value for value in (*changed.values(), deleted)
+            if value is not None
+        ]
+        return max(candidates) if candidates else None
+
+    def get_etag(self, last_modified):
+        """
+        В ETag входят только те множества зрителя, которые попадут
+        в ответ с учётом ?fields= и ?omit=, остальные не загружаются.
+        """
+        viewer = get_viewer_state(self.request)
+        fields = self.get_serializer_class().requested_fields(self.request)
+        state = [
+            last_modified.isoformat(),
+            self.request.get_full_path(),
+            viewer.user_id,
+        ]
+        for field, name in self.viewer_fields.items():
+            if field in fields:
+                state.append(hash(getattr(viewer, name)))
+        return hashlib.md5(repr(state).encode()).hexdigest()
+
+    def conditional_response(self, queryset, view, request, *args, **kwargs):
+        last_modified = self.get_last_modified(queryset)
+        if last_modified is None:
+            return view(request, *args, **kwargs)
+        etag = quote_etag(self.get_etag(last_modified))
+        timestamp = None
+        if not request.user.is_authenticated:
+            timestamp = int(last_modified.timestamp())
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+
+class CustomUserViewSet(UserViewSet):
     """
     ViewsSet пользователя.
     """
     queryset = User.objects.all()
+    lookup_field = 'pk'
     pagination_class = CustomPagination
     SubscribeSerializer = SubscribeSerializer
+    throttle_scopes = {'subscribe': 'toggle'}
 
     def get_serializer_class(self):
         if self.action == 'subscribe' or self.action == 'subscriptions':
             return SubscribeSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
-        return User.objects.all()
+        return super().get_queryset().order_by('id')
+
+    def get_permissions(self):
+        if self.action == 'me':
+            self.permission_classes = [IsAuthenticated]
+        return super().get_permissions()
+
+    def perform_destroy(self, instance):
+        schedule_user_deletion(instance)
 
     @action(
         detail=True,
         methods=['post', 'delete'],
-        serializer_class=[IsAuthenticated]
+        permission_classes=[IsAuthenticated]
     )
-    def subscribe(self, requests, pk):
+    def subscribe(self, request, pk):
         if User.objects.get(pk=pk) == self.request.user:
             return Response(
                 'Нельзя подписаться на себя',
@@ -69,6 +342,7 @@ class CustomUserViewSet(viewsets.GenericViewSet):
                 user_id=self.request.user.id,
                 author_id=pk
             )
+            invalidate_viewer_state(request, 'subscriptions')
             serializer = self.get_serializer(User.objects.get(pk=pk))
             return Response(serializer.data)
         if Subscribe.objects.filter(
@@ -79,6 +353,7 @@ class CustomUserViewSet(viewsets.GenericViewSet):
                 user_id=self.request.user.id,
                 author_id=pk
             ).delete()
+            invalidate_viewer_state(request, 'subscriptions')
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             'Вы не подписаны на этого человека',
@@ -88,10 +363,12 @@ class CustomUserViewSet(viewsets.GenericViewSet):
     @action(
         detail=False,
         methods=['get'],
-        serializer_class=[IsAuthenticated],
+        permission_classes=[IsAuthenticated],
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(is_subscribe__user=self.request.user)
+        queryset = User.objects.filter(
+            is_subscribe__user=self.request.user
+        ).order_by('id')
         page = self.paginate_queryset(queryset)
         serializer = SubscribeSerializer(
             page,
@@ -101,7 +378,7 @@ class CustomUserViewSet(viewsets.GenericViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(DeltaSyncMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet списка ингредиентов.
     """
@@ -112,7 +389,7 @@ class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientsFilter
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(DeltaSyncMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet списка тегов.
     """
@@ -121,7 +398,9 @@ class TagsViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(ConditionalGetMixin,
+                     DeltaSyncMixin,
+                     viewsets.ModelViewSet):
     """
     ViewSet рецептов.
     """
@@ -133,12 +412,41 @@ class RecipesViewSet(viewsets.ModelViewSet):
     pagination_class = CustomPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilters
+    throttle_scopes = {
+        'create': 'upload',
+        'partial_update': 'upload',
+        'favorite': 'toggle',
+        'shopping_cart': 'toggle',
+        'download_shopping_cart': 'export',
+        'export_shopping_cart': 'export',
+        'export': 'export',
+    }
 
     def get_serializer_class(self):
         if self.action == 'favorite' or self.action == 'shopping_cart':
             return FavoriteSerializer
         return RecipesSerializer
 
+    def get_queryset(self):
+        queryset = Recipes.objects.all()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        fields = RecipesSerializer.requested_fields(self.request)
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipe_ingredients',
+                queryset=IngredientsForRecipe.objects.select_related(
+                    'ingredients'
+                )
+            ))
+        if 'text' not in fields:
+            queryset = queryset.defer('text')
+        return queryset
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -157,6 +465,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 user_id=self.request.user.id,
                 recipe_id=pk
             )
+            invalidate_viewer_state(request, 'favorites')
             serializer = self.get_serializer(Recipes.objects.get(pk=pk))
             return Response(serializer.data)
         if Favorite.objects.filter(
@@ -167,6 +476,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 user_id=self.request.user.id,
                 recipe_id=pk
             ).delete()
+            invalidate_viewer_state(request, 'favorites')
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             'Рецепта нету в избранном',
@@ -188,6 +498,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 user_id=self.request.user.id,
                 recipe_id=pk
             )
+            invalidate_viewer_state(request, 'cart')
             serializer = self.get_serializer(Recipes.objects.get(pk=pk))
             return Response(serializer.data)
         if Shopping.objects.filter(
@@ -198,6 +509,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 user_id=self.request.user.id,
                 recipe_id=pk
             ).delete()
+            invalidate_viewer_state(request, 'cart')
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             'Рецепта нету в списке покупок',
@@ -206,19 +518,105 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
     @action(detail=False)
     def download_shopping_cart(self, request):
-        shopping_cart = IngredientsForRecipe.objects.filter(
-            recipe__shopping_recipe__user=self.request.user
-        ).values_list(
-            'ingredients__name', 'ingredients__measurement_unit', 'amount'
-        ).order_by(
-            'ingredients__name'
-        )
-        file = 'Список покупок:\n'
-        for ingredients in shopping_cart:
-            name, measurement_unit, amount = ingredients
-            file += f'{name}: {amount} {measurement_unit}\n'
-        response = HttpResponse(file, content_type='text/plain')
+        response = HttpResponse(
+            shopping_list_text(self.request.user.id),
+            content_type='text/plain'
+        )
         response['Content-Disposition'] = (
             'attachment; filename="shopping-list.txt"'
         )
         return response
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated]
+    )
+    def export_shopping_cart(self, request):
+        job = enqueue(
+            render_shopping_list,
+            user=request.user,
+            user_id=request.user.id
+        )
+        return Response(
+            JobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def export(self, request):
+        response = StreamingHttpResponse(
+            export_ndjson(),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"'
+        )
+        return response
+
+
+class JobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet статуса фоновых задач пользователя.
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(user=self.request.user)
+
+
+class MetricsView(APIView):
+    """
+    Метрики внутренних кешей процесса. Только для администраторов,
+    в том числе вошедших в админку.
+    """
+    authentication_classes = [CachedTokenAuthentication,
+                              SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'token_cache': token_cache.stats(),
+            'viewer_cache': viewer_cache.stats(),
+            'throttle': throttle_stats(),
+        })
+
+
+class ProfilesView(APIView):
+    """
+    Профили запросов по маршрутам. ?output=collapsed или speedscope
+    отдаёт суммарные стеки (?route= - одного маршрута) для flame graph.
+    Только для администраторов, в том числе вошедших в админку.
+    """
+    authentication_classes = [CachedTokenAuthentication,
+                              SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        output = request.query_params.get('output', 'json')
+        route = request.query_params.get('route')
+        if output == 'collapsed':
+            return HttpResponse(
+                to_collapsed(profile_store.merged(route)),
+                content_type='text/plain'
+            )
+        if output == 'speedscope':
+            response = HttpResponse(
+                to_speedscope(profile_store.merged(route), route or 'all'),
+                content_type='application/json'
+            )
+            response['Content-Disposition'] = (
+                'attachment; filename="profile.speedscope.json"'
+            )
+            return response
+        routes = profile_store.routes()
+        if route is not None:
+            routes = {route: routes.get(route, [])}
+        return Response(routes)
+
+    def delete(self, request):
+        profile_store.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
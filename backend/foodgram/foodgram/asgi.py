@@ -13,4 +13,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.events import check_backend, recipe_events  # noqa: E402
+
+check_backend()
+
+EVENT_STREAMS = {
+    '/api/events/recipes/': recipe_events,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] in EVENT_STREAMS:
+        return await EVENT_STREAMS[scope['path']](scope, receive, send)
+    return await django_application(scope, receive, send)
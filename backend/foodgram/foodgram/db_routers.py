@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import OperationalError
+
+PIN_COOKIE = 'pin_primary'
+
+read_from_replica = ContextVar('read_from_replica', default=False)
+unavailable_until = {}
+
+
+def mark_unavailable(alias):
+    connections[alias].close()
+    unavailable_until[alias] = (
+        time.monotonic() + settings.REPLICA_RETRY_SECONDS
+    )
+
+
+def replica_available(alias):
+    """
+    Открытое соединение считается рабочим без проверки: обрыв после
+    подключения ловит ReplicaRoutingMiddleware.process_exception.
+    """
+    if unavailable_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except OperationalError:
+        mark_unavailable(alias)
+        return False
+    return True
+
+
+def drop_broken_replicas():
+    for alias in settings.DATABASE_REPLICAS:
+        connection = connections[alias]
+        if connection.connection is not None and not connection.is_usable():
+            mark_unavailable(alias)
+
+
+def pin_key(request):
+    """
+    Ключ закрепления за основной базой для клиентов с токеном,
+    которые не хранят cookie.
+    """
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+    return f'pin_primary:{digest}'
+
+
+class ReplicaRouter:
+    """
+    Чтение в безопасных запросах уходит на случайную доступную реплику,
+    всё остальное (запись, миграции, команды, воркеры) - на основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not read_from_replica.get():
+            return DEFAULT_DB_ALIAS
+        replicas = random.sample(
+            settings.DATABASE_REPLICAS, len(settings.DATABASE_REPLICAS)
+        )
+        for alias in replicas:
+            if replica_available(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплик для GET/HEAD/OPTIONS. После записи клиент
+    получает cookie, а клиент с токеном - отметку в кеше REPLICA_PIN_CACHE,
+    и на REPLICA_PIN_SECONDS его чтения идут на основную базу, чтобы он
+    сразу видел свои изменения. Если реплика отвалилась посреди запроса,
+    она исключается из выборки, а запрос повторяется на основной базе.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = read_from_replica.set(self.use_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self.pin_primary(request, response)
+
+    async def __acall__(self, request):
+        token = read_from_replica.set(self.use_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+        return self.pin_primary(request, response)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, OperationalError) or (
+                not read_from_replica.get()):
+            return None
+        drop_broken_replicas()
+        view = request.resolver_match.func
+        if asyncio.iscoroutinefunction(view):
+            return None
+        read_from_replica.set(False)
+        return view(
+            request,
+            *request.resolver_match.args,
+            **request.resolver_match.kwargs
+        )
+
+    def use_replica(self, request):
+        if request.method not in self.safe_methods or (
+                not settings.DATABASE_REPLICAS):
+            return False
+        if PIN_COOKIE in request.COOKIES:
+            return False
+        key = pin_key(request)
+        return key is None or (
+            caches[settings.REPLICA_PIN_CACHE].get(key) is None
+        )
+
+    def pin_primary(self, request, response):
+        if request.method in self.safe_methods or (
+                not settings.DATABASE_REPLICAS):
+            return response
+        response.set_cookie(
+            PIN_COOKIE,
+            '1',
+            max_age=settings.REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite='Lax'
+        )
+        key = pin_key(request)
+        if key is not None:
+            caches[settings.REPLICA_PIN_CACHE].set(
+                key, 1, settings.REPLICA_PIN_SECONDS
+            )
+        return response
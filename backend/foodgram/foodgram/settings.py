@@ -42,10 +42,14 @@ INSTALLED_APPS = [
 
     'api',
     'recipes',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.ProfilingMiddleware',
+    'foodgram.db_routers.ReplicaRoutingMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,6 +100,28 @@ DATABASES = {
         }
 }
 
+# Реплики для чтения: DB_REPLICAS - список через запятую хостов
+# PostgreSQL (для SQLite - путей к файлам базы).
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', default='').split(',')),
+        start=1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DATABASES[alias]['ENGINE'].endswith('sqlite3'):
+        DATABASES[alias]['NAME'] = replica.strip()
+    else:
+        DATABASES[alias]['HOST'] = replica.strip()
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.db_routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', default=30))
+# Кеш отметок чтения с основной базы для клиентов с токеном; при
+# нескольких процессах нужен общий кеш (Redis, Memcached).
+REPLICA_PIN_CACHE = os.getenv('REPLICA_PIN_CACHE', default='default')
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -137,6 +163,8 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Картинки рецептов моложе этого числа секунд не удаляются как сироты.
+IMAGE_MIN_AGE = int(os.getenv('IMAGE_MIN_AGE', default=24 * 60 * 60))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -148,13 +176,86 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
+        'api.authentication.CachedTokenAuthentication'
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.ScopedTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'read': os.getenv('THROTTLE_READ', default='3000/min'),
+        'write': os.getenv('THROTTLE_WRITE', default='120/min'),
+        'toggle': os.getenv('THROTTLE_TOGGLE', default='60/min'),
+        'upload': os.getenv('THROTTLE_UPLOAD', default='20/min'),
+        'export': os.getenv('THROTTLE_EXPORT', default='5/min'),
+    },
+    # Перед приложением стоит один прокси (nginx).
+    'NUM_PROXIES': 1,
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     # 'PAGE_SIZE': 6
 }
 
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=4096))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=60))
+VIEWER_STATE_CACHE_SIZE = int(
+    os.getenv('VIEWER_STATE_CACHE_SIZE', default=4096)
+)
+VIEWER_STATE_TTL = int(os.getenv('VIEWER_STATE_TTL', default=5))
+DELTA_SYNC_PAGE_SIZE = int(os.getenv('DELTA_SYNC_PAGE_SIZE', default=500))
+# Сколько секунд хранятся записи об удалении (prune_tombstones).
+TOMBSTONE_RETENTION = int(
+    os.getenv('TOMBSTONE_RETENTION', default=30 * 24 * 60 * 60)
+)
+JOBS_POLL_INTERVAL = float(os.getenv('JOBS_POLL_INTERVAL', default=1))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', default=10))
+JOBS_STALE_TIMEOUT = int(os.getenv('JOBS_STALE_TIMEOUT', default=600))
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', default=5))
+# События пишут WSGI-процессы, а SSE держит отдельный ASGI-сервис,
+# поэтому на PostgreSQL они передаются через LISTEN/NOTIFY.
+EVENTS_BACKEND = os.getenv(
+    'EVENTS_BACKEND',
+    default='api.events.PostgresBackend'
+    if DATABASES['default']['ENGINE'].endswith('postgresql')
+    else 'api.events.LocalBackend'
+)
+# LocalBackend работает, только когда API и SSE обслуживает один
+# процесс uvicorn (например, при разработке на SQLite).
+EVENTS_SINGLE_PROCESS = os.getenv('EVENTS_SINGLE_PROCESS', default='0') == '1'
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', default=100))
+EVENTS_HEARTBEAT = int(os.getenv('EVENTS_HEARTBEAT', default=15))
+# Асинхронные GET для тегов, ингредиентов и рецептов; включать
+# только при запуске под ASGI (uvicorn).
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='0') == '1'
+ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', default=16))
+# Хранилище корзин троттлинга: LocalBucketStore или CacheBucketStore.
+THROTTLE_STORE = os.getenv(
+    'THROTTLE_STORE',
+    default='api.throttling.LocalBucketStore'
+)
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE', default='default')
+THROTTLE_LOCAL_MAXSIZE = int(os.getenv('THROTTLE_LOCAL_MAXSIZE', default=100000))
+# Профилирование: доля запросов и секрет для заголовка X-Profile.
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', default=0))
+PROFILER_SECRET = os.getenv('PROFILER_SECRET', default='')
+# sample - статистический сэмплер стеков, cprofile - cProfile.
+PROFILER_MODE = os.getenv('PROFILER_MODE', default='sample')
+PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', default=0.005))
+PROFILER_BUFFER_SIZE = int(os.getenv('PROFILER_BUFFER_SIZE', default=20))
+PROFILER_TOP_STACKS = int(os.getenv('PROFILER_TOP_STACKS', default=50))
+PROFILER_DUMP_DIR = os.getenv('PROFILER_DUMP_DIR', default='')
+# Списки админки длиннее этого числа строк считаются по статистике pg_class.
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('ADMIN_EXACT_COUNT_LIMIT', default=10000))
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'HIDE_USERS': False,
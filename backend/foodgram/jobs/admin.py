@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'attempts', 'progress',
+                    'user', 'created_at']
+    list_filter = ['status', 'task']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+
+
+admin.site.register(Job, JobAdmin)
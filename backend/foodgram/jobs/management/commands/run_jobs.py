@@ -0,0 +1,44 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.worker import claim_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить все готовые задачи и завершиться.'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while self.running:
+            close_old_connections()
+            job = claim_job()
+            if job is None:
+                if options['once']:
+                    break
+                requeue_stale_jobs()
+                time.sleep(options['sleep'])
+                continue
+            job = run_job(job)
+            self.stdout.write(f'{job.task} {job.pk}: {job.status}')
+
+    def stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,113 @@
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Модель фоновой задачи.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    task = models.CharField(
+        'Задача',
+        max_length=200
+    )
+    kwargs = models.JSONField(
+        'Аргументы',
+        default=dict,
+        blank=True
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Пользователь'
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попытки',
+        default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=3
+    )
+    progress = models.PositiveSmallIntegerField(
+        'Прогресс, %',
+        default=0
+    )
+    result = models.JSONField(
+        'Результат',
+        null=True,
+        blank=True
+    )
+    error = models.TextField(
+        'Ошибка',
+        blank=True
+    )
+    run_after = models.DateTimeField(
+        'Запустить после',
+        default=timezone.now
+    )
+    locked_at = models.DateTimeField(
+        'Взята в работу',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'],
+                name='job_status_run_after'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.task} ({self.status})'
+
+    def set_progress(self, percent):
+        """
+        Сохраняет прогресс и продлевает захват задачи: по locked_at
+        воркер отличает долгую задачу от зависшей.
+        """
+        now = timezone.now()
+        self.progress = min(max(int(percent), 0), 100)
+        self.locked_at = now
+        Job.objects.filter(pk=self.pk).update(
+            progress=self.progress,
+            locked_at=now,
+            updated_at=now
+        )
@@ -0,0 +1,32 @@
+from .models import Job
+
+tasks = {}
+
+
+def task(func=None, *, name=None, bind=False, max_attempts=3):
+    """
+    Регистрирует функцию как фоновую задачу. С bind=True первым
+    аргументом передаётся сама задача (Job), например для set_progress.
+    """
+    def register(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.bind = bind
+        func.max_attempts = max_attempts
+        tasks[func.task_name] = func
+        return func
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def enqueue(func, user=None, **kwargs):
+    """
+    Ставит задачу в очередь. Аргументы должны сериализоваться в JSON.
+    """
+    return Job.objects.create(
+        task=func.task_name,
+        kwargs=kwargs,
+        user=user,
+        max_attempts=func.max_attempts
+    )
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job
+from .worker import requeue_stale_jobs
+
+
+class RequeueStaleJobsTest(TestCase):
+
+    def create_running(self, attempts=1, max_attempts=3):
+        locked_at = timezone.now() - timedelta(
+            seconds=settings.JOBS_STALE_TIMEOUT + 1
+        )
+        return Job.objects.create(
+            task='test',
+            status=Job.RUNNING,
+            attempts=attempts,
+            max_attempts=max_attempts,
+            locked_at=locked_at
+        )
+
+    def test_progress_keeps_job_running(self):
+        job = self.create_running()
+        job.set_progress(50)
+        self.assertEqual(requeue_stale_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+
+    def test_stale_job_requeued(self):
+        job = self.create_running()
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertIsNone(job.locked_at)
+
+    def test_exhausted_job_failed(self):
+        job = self.create_running(attempts=3)
+        self.assertEqual(requeue_stale_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertTrue(job.error)
@@ -0,0 +1,86 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .registry import tasks
+
+logger = logging.getLogger(__name__)
+
+
+def claim_job():
+    """
+    Забирает одну готовую к запуску задачу. SELECT ... FOR UPDATE
+    SKIP LOCKED позволяет нескольким воркерам не мешать друг другу.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.PENDING,
+            run_after__lte=now
+        ).order_by('run_after').first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_at = now
+        job.save(update_fields=['status', 'attempts', 'locked_at',
+                                'updated_at'])
+    return job
+
+
+def requeue_stale_jobs():
+    """
+    Возвращает в очередь задачи, воркер которых перестал отвечать
+    дольше JOBS_STALE_TIMEOUT с последнего set_progress. Задачи,
+    исчерпавшие попытки, помечаются ошибкой.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_STALE_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=deadline)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED,
+        locked_at=None,
+        error='Воркер перестал отвечать, попытки исчерпаны',
+        updated_at=timezone.now()
+    )
+    return stale.update(
+        status=Job.PENDING,
+        locked_at=None,
+        updated_at=timezone.now()
+    )
+
+
+def run_job(job):
+    func = tasks.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f'Задача {job.task} не зарегистрирована')
+        args = (job,) if func.bind else ()
+        result = func(*args, **job.kwargs)
+    except Exception:
+        logger.exception('Задача %s (%s) завершилась ошибкой',
+                         job.task, job.pk)
+        job.error = traceback.format_exc()
+        if func is not None and job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.FAILED
+        job.locked_at = None
+        job.save(update_fields=['status', 'error', 'run_after',
+                                'locked_at', 'updated_at'])
+        return job
+    job.status = Job.DONE
+    job.result = result
+    job.progress = 100
+    job.locked_at = None
+    job.save(update_fields=['status', 'result', 'progress', 'locked_at',
+                            'updated_at'])
+    return job
@@ -1,19 +1,91 @@
 from django.contrib import admin
-from .models import Ingredients, Tags, Recipes
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+from django.db.models import Count
+
+from jobs.registry import enqueue
+from .models import (Ingredients,
+                     IngredientsForRecipe,
+                     NUTRITION_FIELDS,
+                     Tags,
+                     Recipes)
+from .paginators import EstimatedCountPaginator
+from .services import recount_totals
+from .tasks import recount_recipe_totals, schedule_user_deletion
 
 
 class IngredientsAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'measurement_unit']
+    list_display = ['id', 'name', 'measurement_unit', 'kcal', 'price']
+    search_fields = ['name']
+    ordering = ['name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and set(form.changed_data) & set(NUTRITION_FIELDS):
+            enqueue(recount_recipe_totals, ingredient_ids=[obj.pk])
 
 
 class TagsAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'color', 'slug']
+    search_fields = ['name', 'slug']
+
+
+class IngredientsForRecipeInline(admin.TabularInline):
+    model = IngredientsForRecipe
+    autocomplete_fields = ['ingredients']
+    extra = 0
+    min_num = 1
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name']
+    list_display = ['id', 'name', 'author', 'favorites_count',
+                    'total_kcal', 'total_price']
+    list_select_related = ['author']
+    list_filter = ['tags']
+    search_fields = ['name', 'author__username']
+    autocomplete_fields = ['author', 'tags']
+    readonly_fields = ['favorites_count', 'total_kcal', 'total_protein',
+                       'total_fat', 'total_carbs', 'total_price']
+    inlines = [IngredientsForRecipeInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_count=Count('recipe_favorite', distinct=True)
+        )
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recount_totals([form.instance.pk])
+
+    @admin.display(description='В избранном', ordering='favorites_count')
+    def favorites_count(self, obj):
+        return obj.favorites_count
+
+
+class CustomUserAdmin(UserAdmin):
+    list_display = ['id', 'username', 'email', 'first_name', 'last_name',
+                    'is_staff', 'is_active']
+    list_filter = ['is_staff', 'is_superuser', 'is_active']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['purge_users']
+
+    @admin.action(description='Удалить в фоне вместе с рецептами')
+    def purge_users(self, request, queryset):
+        for user in queryset:
+            schedule_user_deletion(user)
+        self.message_user(
+            request,
+            f'Пользователей поставлено на удаление: {len(queryset)}'
+        )
 
 
 admin.site.register(Ingredients, IngredientsAdmin)
 admin.site.register(Tags, TagsAdmin)
 admin.site.register(Recipes, RecipeAdmin)
+admin.site.unregister(User)
+admin.site.register(User, CustomUserAdmin)
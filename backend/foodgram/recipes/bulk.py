@@ -0,0 +1,165 @@
+import json
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Ingredients, IngredientsForRecipe, Recipes, Tags
+from .services import recount_totals
+
+# Во время импорта о новых рецептах не объявляется по одному:
+# иначе каждая строка файла дала бы событие подписчикам автора.
+importing = ContextVar('importing', default=False)
+
+
+def iter_recipes(chunk_size=500):
+    """
+    Обходит рецепты пачками по первичному ключу. Каждая пачка
+    загружается с автором, тегами и ингредиентами за три запроса,
+    поэтому расход памяти не зависит от общего числа рецептов.
+    """
+    queryset = Recipes.objects.order_by('pk').select_related(
+        'author'
+    ).prefetch_related(
+        'tags',
+        Prefetch(
+            'recipe_ingredients',
+            queryset=IngredientsForRecipe.objects.select_related(
+                'ingredients'
+            )
+        )
+    )
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_pk = chunk[-1].pk
+
+
+def recipe_to_dict(recipe):
+    return {
+        'name': recipe.name,
+        'author': recipe.author.email,
+        'image': recipe.image.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': item.ingredients.name,
+                'measurement_unit': item.ingredients.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipe_ingredients.all()
+        ],
+    }
+
+
+def export_ndjson(chunk_size=500):
+    for recipe in iter_recipes(chunk_size):
+        yield json.dumps(
+            recipe_to_dict(recipe),
+            ensure_ascii=False
+        ).encode() + b'\n'
+
+
+class RecipeImporter:
+    """
+    Построчный импорт рецептов из NDJSON. Рецепты пишутся пачками
+    по batch_size в отдельных транзакциях.
+    """
+
+    def __init__(self, batch_size=500, default_author=None):
+        self.batch_size = batch_size
+        self.default_author = default_author
+        self.imported = 0
+        self.skipped = []
+        self._authors = {}
+        self._tags = {tag.slug: tag for tag in Tags.objects.all()}
+        self._ingredients = {
+            (item.name, item.measurement_unit): item
+            for item in Ingredients.objects.all()
+        }
+
+    def run(self, lines):
+        batch = []
+        for number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                batch.append(self._prepare(json.loads(line)))
+            except (ValueError, KeyError, TypeError) as error:
+                self.skipped.append((number, str(error)))
+                continue
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+        return self.imported
+
+    def _author(self, email):
+        if email not in self._authors:
+            self._authors[email] = User.objects.filter(
+                email=email
+            ).first() or self.default_author
+        author = self._authors[email]
+        if author is None:
+            raise ValueError(f'Автор {email} не найден')
+        return author
+
+    def _ingredient(self, data):
+        key = (data['name'], data['measurement_unit'])
+        if key not in self._ingredients:
+            self._ingredients[key] = Ingredients.objects.create(
+                name=key[0],
+                measurement_unit=key[1]
+            )
+        return self._ingredients[key]
+
+    def _prepare(self, data):
+        recipe = Recipes(
+            name=data['name'],
+            author=self._author(data['author']),
+            image=data['image'],
+            text=data['text'],
+            cooking_time=int(data['cooking_time'])
+        )
+        tags = [self._tags[slug] for slug in data['tags']]
+        ingredients = [
+            (self._ingredient(item), int(item['amount']))
+            for item in data['ingredients']
+        ]
+        return recipe, tags, ingredients
+
+    @transaction.atomic
+    def _write(self, batch):
+        tag_links = []
+        ingredient_links = []
+        token = importing.set(True)
+        try:
+            for recipe, _, _ in batch:
+                recipe.save()
+        finally:
+            importing.reset(token)
+        for recipe, tags, ingredients in batch:
+            tag_links.extend(
+                Recipes.tags.through(recipes=recipe, tags=tag)
+                for tag in tags
+            )
+            ingredient_links.extend(
+                IngredientsForRecipe(
+                    recipe=recipe,
+                    ingredients=ingredient,
+                    amount=amount
+                )
+                for ingredient, amount in ingredients
+            )
+        Recipes.tags.through.objects.bulk_create(tag_links)
+        IngredientsForRecipe.objects.bulk_create(ingredient_links)
+        recount_totals([recipe.pk for recipe, _, _ in batch])
+        self.imported += len(batch)
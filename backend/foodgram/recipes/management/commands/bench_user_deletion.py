@@ -0,0 +1,115 @@
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from jobs.registry import enqueue
+from jobs.worker import run_job
+from recipes.models import (Favorite,
+                            Ingredients,
+                            IngredientsForRecipe,
+                            Recipes,
+                            Tags)
+from recipes.tasks import purge_user
+
+
+def create_heavy_user(recipes, ingredients, fan):
+    """
+    Автор с recipes рецептами по ingredients ингредиентов и тегу
+    в каждом; все его рецепты в избранном у fan.
+    """
+    suffix = uuid.uuid4().hex[:8]
+    author = User.objects.create(
+        username=f'bench-{suffix}',
+        email=f'bench-{suffix}@example.com'
+    )
+    Recipes.objects.bulk_create(
+        Recipes(
+            name=f'Рецепт {number}',
+            text='Описание',
+            cooking_time=10,
+            author=author
+        )
+        for number in range(recipes)
+    )
+    created = list(Recipes.objects.filter(author=author).only('pk'))
+    items = list(Ingredients.objects.all()[:ingredients])
+    tag = Tags.objects.first()
+    IngredientsForRecipe.objects.bulk_create(
+        (
+            IngredientsForRecipe(recipe=recipe, ingredients=item, amount=1)
+            for recipe in created for item in items
+        ),
+        batch_size=5000
+    )
+    if tag is not None:
+        Recipes.tags.through.objects.bulk_create(
+            (
+                Recipes.tags.through(recipes=recipe, tags=tag)
+                for recipe in created
+            ),
+            batch_size=5000
+        )
+    Favorite.objects.bulk_create(
+        (Favorite(user=fan, recipe=recipe) for recipe in created),
+        batch_size=5000
+    )
+    return author
+
+
+def measure(func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение удаления пользователя с множеством рецептов: '
+        'фоновая задача purge_user против User.delete().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients', type=int, default=5)
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--skip-collector',
+            action='store_true',
+            help='Не запускать медленный User.delete().'
+        )
+
+    def handle(self, *args, **options):
+        fan = User.objects.create(username=f'fan-{uuid.uuid4().hex[:8]}')
+        results = []
+
+        author = create_heavy_user(
+            options['recipes'], options['ingredients'], fan
+        )
+        job = enqueue(
+            purge_user,
+            user_id=author.pk,
+            chunk_size=options['chunk_size']
+        )
+        results.append(('purge_user', *measure(lambda: run_job(job))))
+        job.refresh_from_db()
+        if job.status != job.DONE:
+            self.stderr.write(job.error)
+
+        if not options['skip_collector']:
+            author = create_heavy_user(
+                options['recipes'], options['ingredients'], fan
+            )
+            results.append(('User.delete', *measure(author.delete)))
+
+        fan.delete()
+        for name, elapsed, peak in results:
+            self.stdout.write(
+                f'{name:>12}: {elapsed:.2f} с, пик памяти {peak:.1f} МБ'
+            )
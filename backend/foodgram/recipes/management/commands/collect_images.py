@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from recipes.models import Recipes
+from recipes.storage import orphaned_files
+
+
+class Command(BaseCommand):
+    help = 'Удаление картинок рецептов, на которые не осталось ссылок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=settings.IMAGE_MIN_AGE,
+            help='Не трогать файлы моложе указанного числа секунд.'
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        field = Recipes._meta.get_field('image')
+        references = Recipes.objects.exclude(image='').values(
+            'image'
+        ).annotate(refs=Count('id')).values_list('image', 'refs')
+        referenced = {}
+        for name, refs in references.iterator():
+            referenced[name] = refs
+        shared = sum(1 for refs in referenced.values() if refs > 1)
+        removed = 0
+        if not field.storage.exists(field.upload_to):
+            return
+        for name in orphaned_files(
+                field.storage,
+                field.upload_to,
+                referenced,
+                options['min_age']
+        ):
+            if options['dry_run']:
+                self.stdout.write(f'Будет удалено: {name}')
+            else:
+                field.storage.delete(name)
+                self.stdout.write(f'Удалено: {name}')
+            removed += 1
+        self.stdout.write(
+            f'Используется файлов: {len(referenced)}, '
+            f'из них общих для нескольких рецептов: {shared}, '
+            f'удалено: {removed}'
+        )
@@ -0,0 +1,37 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.bulk import export_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка рецептов с тегами и ингредиентами в NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o', '--output',
+            help='Файл для выгрузки, по умолчанию stdout.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        output = (
+            open(options['output'], 'wb') if options['output']
+            else sys.stdout.buffer
+        )
+        started = time.monotonic()
+        count = 0
+        try:
+            for line in export_ndjson(options['chunk_size']):
+                output.write(line)
+                count += 1
+        finally:
+            if options['output']:
+                output.close()
+        elapsed = time.monotonic() - started
+        self.stderr.write(
+            f'Выгружено рецептов: {count} за {elapsed:.1f} с '
+            f'({count / elapsed if elapsed else 0:.0f} в секунду)'
+        )
@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.bulk import RecipeImporter
+
+
+class Command(BaseCommand):
+    help = 'Загрузка рецептов из NDJSON, выгруженного export_recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--author',
+            help='Email автора для рецептов с неизвестным автором.'
+        )
+
+    def handle(self, *args, **options):
+        default_author = None
+        if options['author']:
+            default_author = User.objects.filter(
+                email=options['author']
+            ).first()
+            if default_author is None:
+                raise CommandError(
+                    f'Пользователь {options["author"]} не найден'
+                )
+        importer = RecipeImporter(
+            batch_size=options['batch_size'],
+            default_author=default_author
+        )
+        started = time.monotonic()
+        with open(options['path'], encoding='utf-8') as file:
+            count = importer.run(file)
+        elapsed = time.monotonic() - started
+        for number, error in importer.skipped:
+            self.stderr.write(f'Строка {number} пропущена: {error}')
+        self.stdout.write(
+            f'Загружено рецептов: {count} за {elapsed:.1f} с '
+            f'({count / elapsed if elapsed else 0:.0f} в секунду)'
+        )
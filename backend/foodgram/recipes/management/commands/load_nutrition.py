@@ -0,0 +1,78 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from jobs.registry import enqueue
+from recipes.models import Ingredients, NUTRITION_FIELDS
+from recipes.tasks import recount_recipe_totals
+
+
+def parse_decimal(value):
+    value = (value or '').strip().replace(',', '.')
+    if not value:
+        return None
+    return Decimal(value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузка калорийности, БЖУ и цен ингредиентов из CSV с колонками '
+        'name, measurement_unit и любыми из: ' + ', '.join(NUTRITION_FIELDS)
+        + '. Итоги рецептов пересчитываются фоновой задачей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        ingredients = {
+            (item.name, item.measurement_unit): item
+            for item in Ingredients.objects.all()
+        }
+        changed = []
+        now = timezone.now()
+        with open(options['path'], encoding='utf-8') as file:
+            reader = csv.DictReader(file)
+            fields = [
+                field for field in NUTRITION_FIELDS
+                if field in (reader.fieldnames or [])
+            ]
+            if not fields:
+                raise CommandError('В файле нет колонок с данными.')
+            for number, row in enumerate(reader, start=2):
+                item = ingredients.get(
+                    (row['name'], row['measurement_unit'])
+                )
+                if item is None:
+                    self.stderr.write(
+                        f'Строка {number}: ингредиент {row["name"]} '
+                        f'({row["measurement_unit"]}) не найден'
+                    )
+                    continue
+                try:
+                    values = {
+                        field: parse_decimal(row[field]) for field in fields
+                    }
+                except InvalidOperation:
+                    self.stderr.write(f'Строка {number}: неверное число')
+                    continue
+                for field, value in values.items():
+                    setattr(item, field, value)
+                item.updated_at = now
+                changed.append(item)
+        Ingredients.objects.bulk_update(
+            changed,
+            fields + ['updated_at'],
+            batch_size=options['batch_size']
+        )
+        job = enqueue(
+            recount_recipe_totals,
+            ingredient_ids=[item.pk for item in changed]
+        )
+        self.stdout.write(
+            f'Обновлено ингредиентов: {len(changed)}, '
+            f'пересчёт рецептов: задача {job.pk}'
+        )
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаление записей об удалённых объектах старше TOMBSTONE_RETENTION. '
+        'Клиентам с более старой датой синхронизации API ответит 410.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention',
+            type=int,
+            default=settings.TOMBSTONE_RETENTION,
+            help='Хранить записи указанное число секунд.'
+        )
+
+    def handle(self, *args, **options):
+        deadline = timezone.now() - timedelta(seconds=options['retention'])
+        removed, _ = Tombstone.objects.filter(
+            deleted_at__lt=deadline
+        ).delete()
+        self.stdout.write(f'Удалено записей: {removed}')
@@ -0,0 +1,63 @@
+# Generated by Django 3.2 on 2026-10-19 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredients',
+            name='carbs',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True, verbose_name='Углеводы на единицу, г'),
+        ),
+        migrations.AddField(
+            model_name='ingredients',
+            name='fat',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True, verbose_name='Жиры на единицу, г'),
+        ),
+        migrations.AddField(
+            model_name='ingredients',
+            name='kcal',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True, verbose_name='Калории на единицу'),
+        ),
+        migrations.AddField(
+            model_name='ingredients',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True, verbose_name='Цена за единицу'),
+        ),
+        migrations.AddField(
+            model_name='ingredients',
+            name='protein',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True, verbose_name='Белки на единицу, г'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='total_carbs',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Углеводы, г'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='total_fat',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Жиры, г'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='total_kcal',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=14, null=True, verbose_name='Калории'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='total_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=14, null=True, verbose_name='Стоимость'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='total_protein',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True, verbose_name='Белки, г'),
+        ),
+    ]
@@ -2,6 +2,10 @@ from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.db import models
 
+from .storage import recipe_images_storage
+
+NUTRITION_FIELDS = ['kcal', 'protein', 'fat', 'carbs', 'price']
+
 
 class Subscribe(models.Model):
     """
@@ -41,6 +45,46 @@ class Ingredients(models.Model):
         'Единицы измерения',
         max_length=200
     )
+    kcal = models.DecimalField(
+        'Калории на единицу',
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    protein = models.DecimalField(
+        'Белки на единицу, г',
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    fat = models.DecimalField(
+        'Жиры на единицу, г',
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    carbs = models.DecimalField(
+        'Углеводы на единицу, г',
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    price = models.DecimalField(
+        'Цена за единицу',
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     def __str__(self):
         return self.name
@@ -63,6 +107,11 @@ class Tags(models.Model):
         max_length=200,
         unique=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     def __str__(self):
         return self.name
@@ -78,7 +127,8 @@ class Recipes(models.Model):
     )
     image = models.ImageField(
         'Картинка',
-        upload_to='recipes/images'
+        upload_to='recipes/images',
+        storage=recipe_images_storage
     )
     text = models.TextField(
         'Описание'
@@ -101,6 +151,48 @@ class Recipes(models.Model):
         through='IngredientsForRecipe',
         verbose_name='Ингредиент рецепта'
     )
+    total_kcal = models.DecimalField(
+        'Калории',
+        max_digits=14,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        db_index=True
+    )
+    total_protein = models.DecimalField(
+        'Белки, г',
+        max_digits=14,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    total_fat = models.DecimalField(
+        'Жиры, г',
+        max_digits=14,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    total_carbs = models.DecimalField(
+        'Углеводы, г',
+        max_digits=14,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    total_price = models.DecimalField(
+        'Стоимость',
+        max_digits=14,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        db_index=True
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     def __str__(self):
         return self.name
@@ -175,3 +267,28 @@ class Shopping(models.Model):
                 name='shopping'
             )
         ]
+
+
+class Tombstone(models.Model):
+    """
+    Модель записей об удалённых объектах для дельта-синхронизации.
+    """
+    model = models.CharField(
+        'Модель',
+        max_length=100
+    )
+    object_id = models.BigIntegerField(
+        'Id удалённого объекта'
+    )
+    deleted_at = models.DateTimeField(
+        'Дата удаления',
+        auto_now_add=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['model', 'deleted_at'],
+                name='tombstone_model_deleted_at'
+            )
+        ]
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор админки: для нефильтрованного списка на PostgreSQL
+    число строк берётся из статистики pg_class вместо COUNT(*) по всей
+    таблице. Небольшие таблицы и отфильтрованные списки считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate()
+        if estimate is not None and (
+            estimate > settings.ADMIN_EXACT_COUNT_LIMIT
+        ):
+            return estimate
+        return Paginator.count.func(self)
+
+    def estimate(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where:
+            return None
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [self.object_list.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models import (DecimalField,
+                              ExpressionWrapper,
+                              F,
+                              OuterRef,
+                              Q,
+                              Subquery,
+                              Sum)
+from django.utils import timezone
+
+from .models import (Favorite,
+                     IngredientsForRecipe,
+                     NUTRITION_FIELDS,
+                     Recipes,
+                     Shopping,
+                     Subscribe)
+
+
+def shopping_list_text(user_id):
+    shopping_cart = IngredientsForRecipe.objects.filter(
+        recipe__shopping_recipe__user_id=user_id
+    ).values_list(
+        'ingredients__name', 'ingredients__measurement_unit', 'amount',
+        'ingredients__price'
+    ).order_by(
+        'ingredients__name'
+    )
+    lines = ['Список покупок:\n']
+    total_price = 0
+    without_price = 0
+    for ingredients in shopping_cart:
+        name, measurement_unit, amount, price = ingredients
+        lines.append(f'{name}: {amount} {measurement_unit}\n')
+        if price is None:
+            without_price += 1
+        else:
+            total_price += amount * price
+    if len(lines) > 1 and without_price < len(lines) - 1:
+        lines.append(f'\nИтого: {total_price:.2f} ₽\n')
+        if without_price:
+            lines.append(f'Без цены позиций: {without_price}\n')
+    return ''.join(lines)
+
+
+def recipe_total(field):
+    return Subquery(
+        IngredientsForRecipe.objects.filter(
+            recipe=OuterRef('pk')
+        ).values('recipe').annotate(
+            total=Sum(ExpressionWrapper(
+                F('amount') * F(f'ingredients__{field}'),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ))
+        ).values('total')
+    )
+
+
+def recount_totals(recipe_ids):
+    """
+    Пересчитывает калорийность, БЖУ и стоимость рецептов одним
+    UPDATE. Ингредиенты без данных в сумму не входят.
+    """
+    return Recipes.objects.filter(pk__in=recipe_ids).update(
+        updated_at=timezone.now(),
+        **{
+            f'total_{field}': recipe_total(field)
+            for field in NUTRITION_FIELDS
+        }
+    )
+
+
+def delete_recipes(recipe_ids):
+    """
+    Удаляет рецепты вместе со связанными строками. Вызывается пачками
+    ограниченного размера, так что сборщик Django держит в памяти
+    не больше одной пачки; надгробия создаёт сигнал post_delete.
+    Возвращает имена картинок удалённых рецептов.
+    """
+    recipes = Recipes.objects.filter(pk__in=recipe_ids)
+    with transaction.atomic():
+        images = list(recipes.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct())
+        recipes.delete()
+    return images
+
+
+def delete_user_relations(user_id, chunk_size=500):
+    """
+    Удаляет избранное, корзину и подписки пользователя. Подписки
+    удаляются пачками: на них подписаны сигналы живых событий.
+    """
+    Favorite.objects.filter(user_id=user_id).delete()
+    Shopping.objects.filter(user_id=user_id).delete()
+    subscriptions = Subscribe.objects.filter(
+        Q(user_id=user_id) | Q(author_id=user_id)
+    ).order_by('pk').values_list('pk', flat=True)
+    while True:
+        chunk = list(subscriptions[:chunk_size])
+        if not chunk:
+            return
+        Subscribe.objects.filter(pk__in=chunk).delete()
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Ingredients, Recipes, Tags, Tombstone
+from .services import recount_totals
+
+
+@receiver(post_delete, sender=Recipes)
+@receiver(post_delete, sender=Tags)
+@receiver(post_delete, sender=Ingredients)
+def create_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model=sender._meta.model_name,
+        object_id=instance.pk
+    )
+
+
+@receiver(pre_delete, sender=Ingredients)
+def remember_ingredient_recipes(sender, instance, **kwargs):
+    """
+    Строки IngredientsForRecipe удалятся каскадом, поэтому рецепты
+    с ингредиентом запоминаются до удаления и пересчитываются после.
+    """
+    instance.affected_recipes = list(Recipes.objects.filter(
+        recipe_ingredients__ingredients=instance
+    ).values_list('pk', flat=True).distinct())
+
+
+@receiver(post_delete, sender=Ingredients)
+def recount_ingredient_recipes(sender, instance, **kwargs):
+    recipe_ids = getattr(instance, 'affected_recipes', None)
+    if recipe_ids:
+        recount_totals(recipe_ids)
+
+
+# Поля пользователя, которые выводятся в рецептах.
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, update_fields,
+                         **kwargs):
+    """
+    Рецепты показывают данные автора, поэтому правка профиля
+    обновляет их updated_at: меняются ETag и дельта-синхронизация.
+    Сохранения только last_login и других полей не в счёт.
+    """
+    if created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    Recipes.objects.filter(author=instance).update(updated_at=timezone.now())
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import posixpath
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла - SHA-256 его содержимого.
+    Одинаковые файлы хранятся один раз и никогда не меняются,
+    поэтому их можно кешировать навсегда.
+    """
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), digest[:2], digest + extension
+        )
+        if self.exists(name):
+            # Повторная загрузка продлевает жизнь файла: иначе сборка
+            # сирот может удалить его до сохранения ссылающегося рецепта.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+    def walk(self, path):
+        directories, files = self.listdir(path)
+        for file in files:
+            yield posixpath.join(path, file)
+        for directory in directories:
+            yield from self.walk(posixpath.join(path, directory))
+
+
+def is_old(storage, name, min_age):
+    deadline = timezone.now() - timedelta(seconds=min_age)
+    return storage.get_modified_time(name) < deadline
+
+
+def orphaned_files(storage, path, referenced, min_age):
+    """
+    Файлы в path, на которые не ссылается ни одна запись и которые
+    старше min_age (чтобы не удалить только что загруженный файл).
+    """
+    for name in storage.walk(path):
+        if name not in referenced and is_old(storage, name, min_age):
+            yield name
+
+
+recipe_images_storage = ContentAddressedStorage()
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+
+from jobs.registry import enqueue, task
+from .models import Recipes
+from .services import (delete_recipes,
+                       delete_user_relations,
+                       recount_totals,
+                       shopping_list_text)
+from .storage import is_old
+
+
+@task(bind=True)
+def render_shopping_list(job, user_id):
+    name = default_storage.save(
+        f'shopping_lists/{job.pk}.txt',
+        ContentFile(shopping_list_text(user_id).encode())
+    )
+    return {'url': default_storage.url(name)}
+
+
+@task(bind=True)
+def recount_recipe_totals(job, ingredient_ids=None, chunk_size=500):
+    """
+    Пересчитывает итоги рецептов, в которых есть ingredient_ids
+    (или всех рецептов), пачками по chunk_size.
+    """
+    queryset = Recipes.objects.order_by('pk')
+    if ingredient_ids is not None:
+        queryset = queryset.filter(
+            recipe_ingredients__ingredients__in=ingredient_ids
+        ).distinct()
+    recipe_ids = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(recipe_ids), chunk_size):
+        recount_totals(recipe_ids[start:start + chunk_size])
+        job.set_progress((start + chunk_size) * 100 / len(recipe_ids))
+    return {'recipes': len(recipe_ids)}
+
+
+@task(bind=True)
+def purge_user(job, user_id, chunk_size=500):
+    """
+    Удаляет пользователя и всё, что с ним связано, пачками рецептов
+    по chunk_size в отдельных транзакциях. Память не зависит от
+    числа рецептов, а прерванная задача при повторе продолжает
+    с того места, где остановилась. Картинки удаляются отдельными
+    задачами.
+    """
+    recipe_ids = Recipes.objects.filter(
+        author_id=user_id
+    ).order_by('pk').values_list('pk', flat=True)
+    total = recipe_ids.count()
+    deleted = 0
+    while True:
+        chunk = list(recipe_ids[:chunk_size])
+        if not chunk:
+            break
+        images = delete_recipes(chunk)
+        if images:
+            enqueue(delete_recipe_images, names=images)
+        deleted += len(chunk)
+        job.set_progress(deleted * 90 / total)
+    delete_user_relations(user_id, chunk_size)
+    User.objects.filter(pk=user_id).delete()
+    return {'recipes': deleted}
+
+
+def schedule_user_deletion(user):
+    """
+    Сразу блокирует пользователя и ставит его удаление в очередь.
+    Задача не привязана к пользователю, иначе удалилась бы вместе с ним.
+    """
+    user.is_active = False
+    user.save(update_fields=['is_active'])
+    return enqueue(purge_user, user_id=user.pk)
+
+
+@task
+def delete_recipe_images(names):
+    """
+    Удаляет картинки, на которые больше не ссылается ни один рецепт:
+    в хранилище по хешу один файл может принадлежать нескольким.
+    Файлы моложе IMAGE_MIN_AGE могли только что загрузить заново.
+    """
+    storage = Recipes._meta.get_field('image').storage
+    referenced = set(Recipes.objects.filter(
+        image__in=names
+    ).values_list('image', flat=True))
+    removed = 0
+    for name in names:
+        if name in referenced or not storage.exists(name):
+            continue
+        if is_old(storage, name, settings.IMAGE_MIN_AGE):
+            storage.delete(name)
+            removed += 1
+    return {'removed': removed}
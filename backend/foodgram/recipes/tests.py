@@ -0,0 +1,138 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from jobs.models import Job
+from jobs.registry import enqueue
+from jobs.worker import run_job
+from .models import (Favorite,
+                     Ingredients,
+                     IngredientsForRecipe,
+                     Recipes,
+                     Tombstone)
+from .services import recount_totals
+from .storage import ContentAddressedStorage, is_old
+from .tasks import delete_recipe_images, purge_user, recount_recipe_totals
+
+
+class IngredientsAdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.ingredient = Ingredients.objects.create(
+            name='Мука', measurement_unit='г'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def change(self, **data):
+        return self.client.post(
+            f'/admin/recipes/ingredients/{self.ingredient.pk}/change/',
+            {
+                'name': 'Мука',
+                'measurement_unit': 'г',
+                **data
+            },
+            SERVER_NAME='localhost'
+        )
+
+    def recount_jobs(self):
+        return Job.objects.filter(task=recount_recipe_totals.task_name)
+
+    def test_nutrition_change_recounts(self):
+        response = self.change(kcal='3.64', price='0.05')
+        self.assertEqual(response.status_code, 302)
+        job = self.recount_jobs().get()
+        self.assertEqual(job.kwargs, {'ingredient_ids': [self.ingredient.pk]})
+
+    def test_name_change_skips_recount(self):
+        response = self.change(name='Мука пшеничная')
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.recount_jobs().exists())
+
+    def test_delete_recounts(self):
+        sugar = Ingredients.objects.create(
+            name='Сахар', measurement_unit='г', kcal=4, price=1
+        )
+        recipe = Recipes.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10,
+            author=self.admin
+        )
+        IngredientsForRecipe.objects.create(
+            recipe=recipe, ingredients=sugar, amount=100
+        )
+        recount_totals([recipe.pk])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.total_kcal, 400)
+        response = self.client.post(
+            f'/admin/recipes/ingredients/{sugar.pk}/delete/',
+            {'post': 'yes'},
+            SERVER_NAME='localhost'
+        )
+        self.assertEqual(response.status_code, 302)
+        recipe.refresh_from_db()
+        self.assertIsNone(recipe.total_kcal)
+        self.assertIsNone(recipe.total_price)
+
+
+class RecipeImagesTest(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.directory.name)
+        self.addCleanup(self.directory.cleanup)
+
+    def save_old(self, content):
+        name = self.storage.save('recipes/image.jpg', ContentFile(content))
+        old = time.time() - settings.IMAGE_MIN_AGE - 60
+        os.utime(self.storage.path(name), (old, old))
+        return name
+
+    def test_saving_duplicate_touches_blob(self):
+        name = self.save_old(b'image')
+        self.assertTrue(is_old(self.storage, name, settings.IMAGE_MIN_AGE))
+        self.storage.save('recipes/other.jpg', ContentFile(b'image'))
+        self.assertFalse(is_old(self.storage, name, settings.IMAGE_MIN_AGE))
+
+    def test_delete_skips_young_blobs(self):
+        old = self.save_old(b'old')
+        young = self.storage.save('recipes/young.jpg', ContentFile(b'young'))
+        field = Recipes._meta.get_field('image')
+        with mock.patch.object(field, 'storage', self.storage):
+            result = delete_recipe_images([old, young])
+        self.assertEqual(result, {'removed': 1})
+        self.assertFalse(self.storage.exists(old))
+        self.assertTrue(self.storage.exists(young))
+
+
+class PurgeUserTest(TestCase):
+
+    def test_recipes_deleted_with_tombstones(self):
+        author = User.objects.create(username='author')
+        fan = User.objects.create(username='fan')
+        Recipes.objects.bulk_create(
+            Recipes(name=f'Рецепт {number}', text='Описание',
+                    cooking_time=10, author=author)
+            for number in range(5)
+        )
+        recipe_ids = set(Recipes.objects.values_list('pk', flat=True))
+        Favorite.objects.bulk_create(
+            Favorite(user=fan, recipe_id=pk) for pk in recipe_ids
+        )
+        job = run_job(enqueue(purge_user, user_id=author.pk, chunk_size=2))
+        self.assertEqual(job.status, Job.DONE)
+        self.assertFalse(User.objects.filter(pk=author.pk).exists())
+        self.assertFalse(Favorite.objects.exists())
+        self.assertEqual(set(Tombstone.objects.filter(
+            model='recipes'
+        ).values_list('object_id', flat=True)), recipe_ids)